@@ -0,0 +1,339 @@
+"""Mixed-workload load test of the API against local stand-ins, reported as JSON per endpoint.
+
+    python -m bench.api_load --users 20 --requests 4000 --output before.json
+    python -m bench.api_load --backend local --compare before.json --max-regression 20
+
+--backend fake (default) runs on mongomock-motor + fakeredis (pip install mongomock-motor fakeredis); --backend local uses MONGO_URI/REDIS_URL
+from the environment (point them at a throwaway database). Upstreams are always in-process stubs.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import zlib
+from collections import defaultdict
+from datetime import date, timedelta
+
+import httpx
+
+from src.app.core import deps
+from src.app.core.http import HttpClientPool
+from src.app.main import app
+
+PASSWORD = "bench-password-1"
+TASK_TYPES = ("task", "meeting", "deadline")
+WORDS = ("exam", "lecture", "lab", "report", "seminar", "deadline", "project", "meeting", "review", "thesis")
+
+# (операция, вес) — доли запросов в смеси
+WORKLOAD = (
+    ("create_task", 15),
+    ("get_task", 10),
+    ("update_task", 8),
+    ("delete_task", 4),
+    ("list_tasks", 35),
+    ("list_tasks_uncached", 10),
+    ("search_tasks", 6),
+    ("import_nager", 4),
+    ("import_weather", 4),
+    ("import_news", 4),
+)
+
+
+def _stub_upstream(latency: float):
+    # Ответы по форме совпадают с настоящими API; задержка имитирует сеть до upstream
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        url = request.url
+        if url.host == "date.nager.at":
+            year = int(url.path.split("/")[-2])
+            payload = [{"date": f"{year}-{month:02d}-01", "localName": f"Holiday {month}", "name": f"Holiday {month}"}
+                       for month in range(1, 13)]
+        elif url.host == "api.open-meteo.com":
+            start = date.today()
+            days = [start + timedelta(days=i) for i in range(int(url.params.get("forecast_days", 3)))]
+            payload = {"daily": {
+                "time": [d.isoformat() for d in days],
+                "weathercode": [61 if i % 2 else 0 for i in range(len(days))],
+                "temperature_2m_max": [4.0 + i for i in range(len(days))],
+                "temperature_2m_min": [-2.0 - i for i in range(len(days))],
+            }}
+        else:
+            query = url.params.get("search", "space")
+            payload = {"results": [
+                {"id": zlib.crc32(f"{query}-{i}".encode()), "title": f"{query} launch {i}",
+                 "published_at": f"{date.today().isoformat()}T00:00:00Z", "url": f"https://example.org/{i}"}
+                for i in range(10)
+            ]}
+        etag = f'"{zlib.crc32(json.dumps(payload, sort_keys=True).encode()):x}"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, json=payload, headers={"ETag": etag})
+    return handler
+
+
+class StubHttpClientPool(HttpClientPool):
+    def __init__(self, latency: float):
+        super().__init__()
+        self.transport = httpx.MockTransport(_stub_upstream(latency))
+
+    def get(self, host: str) -> httpx.AsyncClient:
+        client = self._clients.get(host)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(transport=self.transport, headers={"Accept": "application/json"})
+            self._clients[host] = client
+        return client
+
+
+async def _setup_fake_backends():
+    import fakeredis
+    import mongomock.collection
+    from mongomock_motor import AsyncMongoMockClient
+
+    # mongomock не знает аргумент sort, который новые версии pymongo передают в UpdateOne внутри bulk_write
+    add_update = mongomock.collection.BulkOperationBuilder.add_update
+    mongomock.collection.BulkOperationBuilder.add_update = \
+        lambda self, *args, sort=None, **kwargs: add_update(self, *args, **kwargs)
+
+    deps._mongo_client = AsyncMongoMockClient()
+    await deps.ensure_indexes(deps._mongo_client[deps.settings.MONGO_DB_NAME])
+    await deps.init_tasks_backend()
+
+    redis = fakeredis.FakeAsyncRedis()
+
+    async def get_redis_client():
+        return redis
+
+    app.dependency_overrides[deps.get_redis_client] = get_redis_client
+
+
+async def setup_backends(backend: str, upstream_latency: float):
+    if backend == "local":
+        await deps.init_dependencies()
+        await deps._http_pool.aclose()
+    else:
+        await _setup_fake_backends()
+    deps._http_pool = StubHttpClientPool(upstream_latency)
+
+
+async def teardown_backends(backend: str):
+    app.dependency_overrides.clear()
+    if backend == "local":
+        db = deps._mongo_client[deps.settings.MONGO_DB_NAME]
+        bench_users = await db["users"].find({"email": {"$regex": r"^bench-"}}, {"_id": 1}).to_list(length=None)
+        await db["tasks"].delete_many({"user_id": {"$in": [user["_id"] for user in bench_users]}})
+        await db["users"].delete_many({"_id": {"$in": [user["_id"] for user in bench_users]}})
+    await deps.close_dependencies()
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random, email: str):
+        self.client = client
+        self.rng = rng
+        self.email = email
+        self.headers: dict[str, str] = {}
+        self.task_ids: list[str] = []
+
+    def _random_date(self) -> str:
+        return (date(2025, 1, 1) + timedelta(days=self.rng.randrange(365))).isoformat()
+
+    def _random_title(self) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(3))
+
+    def _pick_task(self) -> str | None:
+        return self.rng.choice(self.task_ids) if self.task_ids else None
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        return await self.client.request(method, url, headers={**self.headers, **kwargs.pop("headers", {})}, **kwargs)
+
+    async def register_and_login(self, record):
+        payload = {"email": self.email, "password": PASSWORD}
+        await record("register", self.client.post("/auth/register", json=payload))
+        response = await record("login", self.client.post("/auth/jwt/login", json=payload))
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def create_task(self):
+        response = await self.request("POST", "/tasks", json={
+            "title": self._random_title(), "date": self._random_date(), "type": self.rng.choice(TASK_TYPES)})
+        if response.status_code == 201:
+            self.task_ids.append(response.json()["id"])
+        return response
+
+    async def get_task(self):
+        task_id = self._pick_task()
+        return await self.request("GET", f"/tasks/{task_id}") if task_id else await self.create_task()
+
+    async def update_task(self):
+        task_id = self._pick_task()
+        if not task_id:
+            return await self.create_task()
+        return await self.request("PATCH", f"/tasks/{task_id}", json={"status": self.rng.choice(("todo", "done"))})
+
+    async def delete_task(self):
+        task_id = self._pick_task()
+        if not task_id:
+            return await self.create_task()
+        self.task_ids.remove(task_id)
+        return await self.request("DELETE", f"/tasks/{task_id}")
+
+    async def list_tasks(self):
+        return await self.request("GET", "/tasks")
+
+    async def list_tasks_uncached(self):
+        return await self.request("GET", "/tasks", params={"type": self.rng.choice(TASK_TYPES)},
+                                  headers={"Cache-Control": "no-cache"})
+
+    async def search_tasks(self):
+        return await self.request("GET", "/tasks/search", params={"q": self.rng.choice(WORDS)})
+
+    async def import_nager(self):
+        return await self.request("POST", "/import/nager",
+                                  params={"country": self.rng.choice(("RU", "DE", "US")), "year": 2025})
+
+    async def import_weather(self):
+        return await self.request("POST", "/import/weather", json={"lat": 55.75, "lon": 37.62, "days": 3})
+
+    async def import_news(self):
+        return await self.request("POST", "/import/news", json={"q": self.rng.choice(("rocket", "mars")), "limit": 10})
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.cache_status: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def __call__(self, operation: str, request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await request
+        self.latencies[operation].append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            self.errors[operation] += 1
+        cache_status = response.headers.get("X-Cache")
+        if cache_status:
+            self.cache_status[operation][cache_status] += 1
+        return response
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return round(sorted_values[index], 3)
+
+
+def _summary(latencies: list[float], elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "throughput_rps": round(len(values) / elapsed, 2),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": _percentile(values, 0.50),
+        "p95_ms": _percentile(values, 0.95),
+        "p99_ms": _percentile(values, 0.99),
+        "max_ms": round(values[-1], 3),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> dict:
+    await setup_backends(args.backend, args.upstream_latency_ms / 1000)
+    recorder = Recorder()
+    operations = [name for name, _ in WORKLOAD]
+    weights = [weight for _, weight in WORKLOAD]
+    per_user = args.requests // args.users
+    run_id = f"{time.time_ns():x}"
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        users = [VirtualUser(client, random.Random(args.seed + i), f"bench-{run_id}-{i}@example.org")
+                 for i in range(args.users)]
+        await asyncio.gather(*(user.register_and_login(recorder) for user in users))
+
+        async def drive(user: VirtualUser):
+            for name in user.rng.choices(operations, weights, k=per_user):
+                await recorder(name, getattr(user, name)())
+
+        start = time.perf_counter()
+        await asyncio.gather(*(drive(user) for user in users))
+        elapsed = time.perf_counter() - start
+
+    await teardown_backends(args.backend)
+
+    endpoints = {}
+    for name in sorted(recorder.latencies):
+        if name in ("register", "login"):
+            continue
+        endpoints[name] = _summary(recorder.latencies[name], elapsed)
+        endpoints[name]["errors"] = recorder.errors[name]
+        if name in recorder.cache_status:
+            endpoints[name]["cache"] = dict(recorder.cache_status[name])
+    auth = {name: _summary(recorder.latencies[name], elapsed) for name in ("register", "login")}
+    workload = [value for name in endpoints for value in recorder.latencies[name]]
+    return {
+        "benchmark": "api_load",
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "params": {
+            "backend": args.backend, "users": args.users, "requests": per_user * args.users,
+            "seed": args.seed, "upstream_latency_ms": args.upstream_latency_ms,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "total": {**_summary(workload, elapsed), "errors": sum(recorder.errors[name] for name in endpoints)},
+        "auth": auth,
+        "endpoints": endpoints,
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list[str]:
+    regressions = []
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            change = (current[metric] - previous[metric]) / previous[metric] * 100 if previous[metric] else 0.0
+            line = f"{name:22} {metric:7} {previous[metric]:9.3f} -> {current[metric]:9.3f} ms ({change:+.1f}%)"
+            print(line, file=sys.stderr)
+            if change > max_regression:
+                regressions.append(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=("fake", "local"), default="fake")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--upstream-latency-ms", type=float, default=20.0)
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report from a previous run")
+    parser.add_argument("--max-regression", type=float, default=25.0, help="allowed percentile growth, %%")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        if regressions:
+            print(f"{len(regressions)} percentile(s) regressed by more than {args.max_regression}%", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
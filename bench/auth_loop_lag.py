@@ -0,0 +1,75 @@
+"""Event-loop lag during a login storm: bcrypt inline on the loop vs the bounded hashing pool.
+
+    python -m bench.auth_loop_lag --logins 64
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from fastapi import HTTPException
+
+from src.app.core.security import hash_password, verify_password, verify_password_async
+
+TICK_SECONDS = 0.005
+
+
+async def _measure_lag(stop: asyncio.Event, lags: list[float]):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(max(0.0, loop.time() - expected) * 1000)
+
+
+async def _inline_login(password: str, password_hash: str):
+    verify_password(password, password_hash)
+
+
+async def _pooled_login(password: str, password_hash: str) -> bool:
+    try:
+        await verify_password_async(password, password_hash)
+        return True
+    except HTTPException:
+        return False
+
+
+async def run_storm(mode: str, logins: int, password_hash: str) -> dict:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_measure_lag(stop, lags))
+    await asyncio.sleep(TICK_SECONDS * 4)
+
+    login = _inline_login if mode == "inline" else _pooled_login
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login("password1", password_hash) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    lags.sort()
+    return {
+        "mode": mode,
+        "logins": logins,
+        "rejected": sum(1 for r in results if r is False),
+        "elapsed_s": round(elapsed, 3),
+        "loop_lag_ms": {
+            "p50": round(statistics.median(lags), 2),
+            "p99": round(lags[int(len(lags) * 0.99) - 1], 2),
+            "max": round(lags[-1], 2),
+        },
+    }
+
+
+async def main(logins: int):
+    password_hash = hash_password("password1")
+    report = [await run_storm(mode, logins, password_hash) for mode in ("inline", "pool")]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins))
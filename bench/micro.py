@@ -0,0 +1,198 @@
+"""Per-item hot paths (importer normalization, cache keys, repository mapping, TaskOut validation).
+
+    python -m bench.micro --sizes 10,1000,100000 --save-baseline micro_before.json
+    python -m bench.micro --compare micro_before.json --max-regression 10
+
+Throughput is reported as items/s (best of the repeats); allocations come from a separate
+tracemalloc pass, so they do not skew the timings.
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from src.app.cache.keys import make_cache_key
+from src.app.db.repositories import MotorTasksRepository
+from src.app.external.nager import NagerImporter
+from src.app.external.news_spaceflight import NewsImporter
+from src.app.external.weather_open_meteo import WeatherImporter
+from src.app.models.tasks import TaskOut
+
+HOLIDAY_NAMES = ("New Year's Day", "День защитника Отечества", "Tag der Deutschen Einheit", "Saint Patrick's Day",
+                 "Independence Day", "Fête nationale", "Christmas Day", "Labour Day / May Day")
+TASK_TYPES = ("task", "meeting", "deadline", "holiday", "news")
+
+
+def _dates(rng: random.Random, n: int) -> list[str]:
+    start = date(2025, 1, 1)
+    return [(start + timedelta(days=rng.randrange(3650))).isoformat() for _ in range(n)]
+
+
+def nager_payload(rng: random.Random, n: int):
+    return [{"date": d, "localName": rng.choice(HOLIDAY_NAMES), "name": "Holiday"} for d in _dates(rng, n)]
+
+
+def weather_payload(rng: random.Random, n: int):
+    return {"daily": {
+        "time": _dates(rng, n),
+        "weathercode": [rng.choice((0, 1, 3, 61, 63, 80)) for _ in range(n)],
+        "temperature_2m_max": [rng.uniform(-10, 35) for _ in range(n)],
+        "temperature_2m_min": [rng.uniform(-25, 20) for _ in range(n)],
+    }}
+
+
+def news_payload(rng: random.Random, n: int):
+    return {"results": [
+        {"id": i if i % 10 else None, "title": f"Launch report {i}", "published_at": f"{d}T12:00:00Z",
+         "url": f"https://example.org/articles/{i}"}
+        for i, d in enumerate(_dates(rng, n))
+    ]}
+
+
+def task_docs(rng: random.Random, n: int):
+    user_id = ObjectId()
+    return [{"_id": ObjectId(), "user_id": user_id, "title": f"Task {i}", "date": d, "type": rng.choice(TASK_TYPES),
+             "status": rng.choice(("todo", "done")), "source": "local", "meta": {}, "title_ngrams": ["tas", "ask"]}
+            for i, d in enumerate(_dates(rng, n))]
+
+
+def cache_key_params(rng: random.Random, n: int):
+    return [(str(ObjectId()), {"date": d, "type": rng.choice(TASK_TYPES), "limit": 50}) for d in _dates(rng, n)]
+
+
+nager = NagerImporter(None)
+weather = WeatherImporter(None)
+news = NewsImporter(None)
+task_list_adapter = TypeAdapter(list[TaskOut])
+
+
+def _validate_task_out(rows):
+    # То же, что делает response_model=list[TaskOut] в list_tasks: валидация и сериализация в JSON-совместимый вид
+    return task_list_adapter.dump_python(task_list_adapter.validate_python(rows), mode="json")
+
+
+# имя -> (генератор входных данных, функция, обрабатывающая весь вход)
+CASES = {
+    "nager.slugify": (
+        lambda rng, n: [rng.choice(HOLIDAY_NAMES) + f" {i}" for i in range(n)],
+        lambda titles: [nager.slugify(title) for title in titles],
+    ),
+    "nager.normalize": (nager_payload, lambda items: nager.normalize(items, "DE")),
+    "weather.normalize": (weather_payload, lambda raw: weather.normalize(raw, 55.7512, 37.6184)),
+    "news.normalize": (news_payload, news.normalize),
+    "make_cache_key": (
+        cache_key_params,
+        lambda params: [make_cache_key(user_id, "GET", "/tasks", query) for user_id, query in params],
+    ),
+    "tasks._to_public": (task_docs, lambda docs: [MotorTasksRepository._to_public(doc) for doc in docs]),
+    "TaskOut.validate": (
+        lambda rng, n: [MotorTasksRepository._to_public(doc) for doc in task_docs(rng, n)],
+        _validate_task_out,
+    ),
+}
+
+
+def measure(func, payload, n: int, min_time: float, min_repeats: int, max_repeats: int) -> dict:
+    # Как и timeit, сборщик мусора на время замеров выключен: иначе большие размеры меряют ещё и GC
+    timings = []
+    deadline = time.perf_counter() + min_time
+    gc.collect()
+    gc.disable()
+    try:
+        while len(timings) < min_repeats or (len(timings) < max_repeats and time.perf_counter() < deadline):
+            start = time.perf_counter()
+            func(payload)
+            timings.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+    best = min(timings)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "items": n,
+        "repeats": len(timings),
+        "items_per_s": round(n / best, 1),
+        "ns_per_item": round(best / n * 1e9, 1),
+        "peak_alloc_bytes": peak - before,
+        "alloc_bytes_per_item": round((peak - before) / n, 1),
+    }
+
+
+def run(args) -> dict:
+    results = {}
+    for name, (make_payload, func) in CASES.items():
+        if args.filter and args.filter not in name:
+            continue
+        for n in args.sizes:
+            payload = make_payload(random.Random(args.seed), n)
+            results[f"{name}[{n}]"] = measure(func, payload, n, args.min_time, args.min_repeats, args.max_repeats)
+            print(f"{name}[{n}]: {results[f'{name}[{n}]']['items_per_s']:,.0f} items/s", file=sys.stderr)
+    return {
+        "benchmark": "micro",
+        "python": platform.python_version(),
+        "params": {"sizes": args.sizes, "seed": args.seed, "min_time": args.min_time},
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list[str]:
+    regressions = []
+    for name, current in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        speedup = current["items_per_s"] / previous["items_per_s"]
+        alloc_change = current["alloc_bytes_per_item"] - previous["alloc_bytes_per_item"]
+        line = (f"{name:28} {previous['items_per_s']:>14,.0f} -> {current['items_per_s']:>14,.0f} items/s "
+                f"(x{speedup:.2f}), alloc/item {alloc_change:+.1f} B")
+        print(line, file=sys.stderr)
+        if (1 - speedup) * 100 > max_regression:
+            regressions.append(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=lambda value: [int(n) for n in value.split(",")], default=[10, 1000, 100000])
+    parser.add_argument("--filter", help="only run cases whose name contains this substring")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds spent repeating each case")
+    parser.add_argument("--min-repeats", type=int, default=3)
+    parser.add_argument("--max-repeats", type=int, default=1000)
+    parser.add_argument("--save-baseline", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="baseline JSON report from a previous run")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="allowed throughput drop, %%")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        if regressions:
+            print(f"{len(regressions)} case(s) slowed down by more than {args.max_regression}%", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from typing import Annotated
+from fastapi import APIRouter, Depends, Query
+
+from src.app.core.deps import get_admin_user
+from src.app.db.profiler import command_profiler
+from src.app.external.resilience import upstream_states
+
+
+router = APIRouter()
+
+
+@router.get("/slow-queries")
+async def slow_queries(
+    limit: Annotated[int | None, Query(ge=1, le=200)] = None,
+    admin=Depends(get_admin_user),
+):
+    return {
+        "threshold_ms": command_profiler.slow_ms,
+        "window_seconds": command_profiler.window_seconds,
+        "items": command_profiler.top(limit),
+    }
+
+
+@router.delete("/slow-queries", status_code=204)
+async def reset_slow_queries(admin=Depends(get_admin_user)):
+    command_profiler.reset()
+
+
+@router.get("/upstreams")
+async def upstreams(admin=Depends(get_admin_user)):
+    return {"items": upstream_states()}
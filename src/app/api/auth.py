@@ -4,8 +4,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 
 from src.app.core.security import (
     create_access_token,
-    hash_password,
-    verify_password
+    hash_password_async,
+    verify_password_async
 )
 from src.app.core.deps import get_users_repo
 from src.app.db.repositories import UsersRepository
@@ -26,7 +26,7 @@ async def register_user(
     if await users.get_by_email(user.get('email')):
         raise HTTPException(status_code=409, detail='Email already registered')
 
-    password_hash = hash_password(user.get('password'))
+    password_hash = await hash_password_async(user.get('password'))
     creation_result = await users.create(user.get('email'), password_hash)
     created_user = UserOut.model_validate(creation_result)
     return created_user
@@ -39,7 +39,7 @@ async def login_user(
         users: UsersRepository = Depends(get_users_repo)
 ):
     user_by_email = await users.get_by_email(str(user.email))
-    if user_by_email and verify_password(user.password, user_by_email.get('password_hash')):
+    if user_by_email and await verify_password_async(user.password, user_by_email.get('password_hash')):
         token = create_access_token(str(user_by_email['id']))
         payload = {
             "access_token": token
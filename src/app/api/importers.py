@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import logging
-from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+import math
+from typing import Annotated, Any, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse
+from redis import RedisError
 
 from src.app.cache.redis import RedisCache
 from src.app.core.deps import (
@@ -11,53 +14,104 @@ from src.app.core.deps import (
     get_weather_importer,
     get_news_importer,
     get_current_user,
-    get_cache_service
+    get_cache_service,
+    get_reminder_queue,
+    get_import_jobs
 )
 from src.app.db.repositories import TasksRepository
+from src.app.external.base import ExternalImporter
+from src.app.external.resilience import CircuitOpenError
 from src.app.external.nager import NagerImporter
 from src.app.external.weather_open_meteo import WeatherImporter
 from src.app.external.news_spaceflight import NewsImporter
-from src.app.models.tasks import WeatherImportRequest, ImportResult, NewsImportRequest
+from src.app.models.tasks import WeatherImportRequest, ImportResult, NewsImportRequest, ImportJobOut
 import httpx
+from src.app.services.import_jobs import ImportJobQueue, import_arguments, import_error
 from src.app.services.import_service import execute_import
 from src.app.cache.service import invalidate_user_cache
+from src.app.services.reminders import ReminderQueue
 
 
 router = APIRouter()
 logger = logging.getLogger("api")
 
+ASYNC_PREFERENCE = "respond-async"
+ASYNC_RESPONSES = {202: {"description": "Import queued (sent with `Prefer: respond-async`)"}}
+
+
+def wants_async(prefer: Optional[str]) -> bool:
+    return bool(prefer) and ASYNC_PREFERENCE in prefer.lower()
+
+
+async def enqueue_import_job(
+    jobs: ImportJobQueue, source: str, params: dict[str, Any], request: Request, user
+) -> JSONResponse:
+    try:
+        job_id = await jobs.enqueue(source, user["id"], params, request.state.request_id)
+    except RedisError:
+        raise HTTPException(status_code=503, detail='Import queue is unavailable', headers={"Retry-After": "30"})
+    if job_id is None:
+        raise HTTPException(status_code=503, detail='Import queue is full', headers={"Retry-After": "30"})
+
+    logger.info("Import job queued", extra={
+        "method": request.method,
+        "path": request.url.path,
+        "status": 202,
+    })
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"job_id": job_id, "status": "queued"},
+        headers={
+            "Location": request.url_for("get_import_job", job_id=job_id).path,
+            "Preference-Applied": ASYNC_PREFERENCE,
+        },
+    )
+
+
+async def run_import(
+    source: str,
+    params: dict[str, Any],
+    request: Request,
+    importer: ExternalImporter,
+    tasks: TasksRepository,
+    cache: RedisCache,
+    reminders: ReminderQueue,
+    user
+) -> ImportResult:
+    fetch_kwargs, normalize_kwargs = import_arguments(source, params)
+    fetch_kwargs["request_id"] = request.state.request_id
+    try:
+        import_result = await execute_import(importer, user['id'], tasks, fetch_kwargs, normalize_kwargs)
+    except (RuntimeError, httpx.TimeoutException, httpx.HTTPStatusError) as e:
+        status_code, detail = import_error(source, e)
+        headers = {"Retry-After": str(math.ceil(e.retry_after))} if isinstance(e, CircuitOpenError) else None
+        raise HTTPException(status_code=status_code, detail=detail, headers=headers)
+
+    await invalidate_user_cache(user["id"], resource="tasks", cache=cache)
+    await reminders.schedule(task.model_dump() for task in import_result.details)
+    return import_result
+
 
 @router.post("/nager",
-             response_model=ImportResult)
+             response_model=ImportResult,
+             responses=ASYNC_RESPONSES)
 async def import_nager(
     request: Request,
     country: Annotated[str, Query(min_length=2, max_length=2, description="ISO-2")],
     year: Annotated[int, Query(ge=1900, le=2100)],
+    prefer: Annotated[Optional[str], Header()] = None,
     tasks: TasksRepository = Depends(get_tasks_repo),
     importer: NagerImporter = Depends(get_nager_importer),
     cache: RedisCache = Depends(get_cache_service),
+    reminders: ReminderQueue = Depends(get_reminder_queue),
+    jobs: ImportJobQueue = Depends(get_import_jobs),
     user=Depends(get_current_user),
 ):
-    try:
-        import_result = await execute_import(importer, user['id'], tasks,
-                                      fetch_kwargs={
-                                          "year": year,
-                                          "country": country,
-                                          "request_id": request.state.request_id
-                                      },
-                                      normalize_kwargs={
-                                          "country": country
-                                      })
-    except RuntimeError:
-        raise HTTPException(status_code=502, detail='Nager.Date unavailable')
-    except httpx.TimeoutException:
-        raise HTTPException(status_code=502, detail='Service unavailable')
-    except httpx.HTTPStatusError as e:
-        if e.response.status_code >= 500:
-            raise HTTPException(status_code=502, detail='Service unavailable')
-        raise HTTPException(status_code=400, detail='Bad Request')
+    params = {"country": country, "year": year}
+    if wants_async(prefer):
+        return await enqueue_import_job(jobs, "nager", params, request, user)
 
-    await invalidate_user_cache(user["id"], resource="tasks", cache=cache)
+    import_result = await run_import("nager", params, request, importer, tasks, cache, reminders, user)
 
     logger.info("Nager imported, cache invalidated", extra={
         "method": request.method,
@@ -68,39 +122,24 @@ async def import_nager(
 
 
 @router.post("/weather",
-             response_model=ImportResult)
+             response_model=ImportResult,
+             responses=ASYNC_RESPONSES)
 async def import_weather(
     request: Request,
     request_body: WeatherImportRequest,
+    prefer: Annotated[Optional[str], Header()] = None,
     tasks: TasksRepository = Depends(get_tasks_repo),
     importer: WeatherImporter = Depends(get_weather_importer),
     cache: RedisCache = Depends(get_cache_service),
+    reminders: ReminderQueue = Depends(get_reminder_queue),
+    jobs: ImportJobQueue = Depends(get_import_jobs),
     user=Depends(get_current_user),
 ):
-    lat = request_body.lat
-    lon = request_body.lon
-    days = request_body.days
-    hot_from = request_body.hot_from
-    cold_to = request_body.cold_to
-    try:
-        import_result = await execute_import(importer, user['id'], tasks,
-                                      fetch_kwargs={
-                                          "lat": lat,
-                                          "lon": lon,
-                                          "days": days,
-                                          "request_id": request.state.request_id
-                                      },
-                                      normalize_kwargs={"lat": lat, "lon": lon, "hot_from": hot_from, "cold_to": cold_to})
-    except httpx.TimeoutException:
-        raise HTTPException(status_code=502, detail='Service unavailable')
-    except httpx.HTTPStatusError as e:
-        if e.response.status_code >= 500:
-            raise HTTPException(status_code=502, detail='Service unavailable')
-        raise HTTPException(status_code=400, detail='Bad Request')
-    except RuntimeError:
-        raise HTTPException(status_code=502, detail='OpenMeteo unavailable')
+    params = request_body.model_dump(mode="json")
+    if wants_async(prefer):
+        return await enqueue_import_job(jobs, "open-meteo", params, request, user)
 
-    await invalidate_user_cache(user["id"], resource="tasks", cache=cache)
+    import_result = await run_import("open-meteo", params, request, importer, tasks, cache, reminders, user)
 
     logger.info("Weather imported, cache invalidated", extra={
         "method": request.method,
@@ -112,34 +151,24 @@ async def import_weather(
 
 
 @router.post("/news",
-             response_model=ImportResult)
+             response_model=ImportResult,
+             responses=ASYNC_RESPONSES)
 async def import_news(
     request: Request,
     request_body: NewsImportRequest,
+    prefer: Annotated[Optional[str], Header()] = None,
     tasks: TasksRepository = Depends(get_tasks_repo),
     importer: NewsImporter = Depends(get_news_importer),
     cache: RedisCache = Depends(get_cache_service),
+    reminders: ReminderQueue = Depends(get_reminder_queue),
+    jobs: ImportJobQueue = Depends(get_import_jobs),
     user=Depends(get_current_user),
 ):
-    try:
-        imported_result = await execute_import(importer, user['id'], tasks,
-                                      fetch_kwargs={
-                                          "q": request_body.q,
-                                          "from_date": request_body.from_date,
-                                          "limit": request_body.limit,
-                                          "request_id": request.state.request_id
-                                      },
-                                      normalize_kwargs={})
-    except httpx.TimeoutException:
-        raise HTTPException(status_code=502, detail='Service unavailable')
-    except httpx.HTTPStatusError as e:
-        if e.response.status_code >= 500:
-            raise HTTPException(status_code=502, detail='Service unavailable')
-        raise HTTPException(status_code=400, detail='Bad Request')
-    except RuntimeError:
-        raise HTTPException(status_code=502, detail='SpaceflightNews unavailable')
+    params = request_body.model_dump(mode="json", by_alias=True)
+    if wants_async(prefer):
+        return await enqueue_import_job(jobs, "spaceflight", params, request, user)
 
-    await invalidate_user_cache(user["id"], resource="tasks", cache=cache)
+    imported_result = await run_import("spaceflight", params, request, importer, tasks, cache, reminders, user)
 
     logger.info("News imported, cache invalidated", extra={
         "method": request.method,
@@ -147,3 +176,18 @@ async def import_news(
         "status": 200,
     })
     return imported_result
+
+
+@router.get("/jobs/{job_id}",
+            response_model=ImportJobOut,
+            name="get_import_job")
+async def get_import_job(
+    job_id: str,
+    jobs: ImportJobQueue = Depends(get_import_jobs),
+    user=Depends(get_current_user),
+):
+    job = await jobs.get(job_id)
+    # Чужое задание неотличимо от несуществующего
+    if not job or job.get("user_id") != user["id"]:
+        raise HTTPException(status_code=404, detail='Import job is not found')
+    return job
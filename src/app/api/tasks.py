@@ -1,22 +1,63 @@
 from __future__ import annotations
 
+import base64
+import binascii
+import json
 import logging
 from datetime import date as date_cls
-from typing import Optional
+from typing import AsyncIterator, Optional
 from bson import ObjectId
 from bson.errors import InvalidId
 from fastapi import APIRouter, Depends, HTTPException, Query, status, Request, Response
+from fastapi.responses import StreamingResponse
 
-from src.app.core.deps import get_current_user, get_tasks_repo, get_cache_service
+from src.app.core.deps import get_current_user, get_tasks_repo, get_cache_service, get_reminder_queue
 from src.app.db.repositories import TasksRepository
 from src.app.models.tasks import TaskCreate, TaskOut, TaskUpdate
-from src.app.cache.service import get_cached_response, set_cached_response, invalidate_user_cache
+from src.app.cache.service import (
+    etag_matches, get_or_set_cached_response, get_resource_etag, invalidate_user_cache, make_resource_etag
+)
 from src.app.core.config import settings
+from src.app.services.reminders import ReminderQueue
 
 
 router = APIRouter()
 logger = logging.getLogger("api")
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+TASK_OUT_FIELDS = tuple(TaskOut.model_fields)
+
+
+def encode_cursor(task: dict) -> str:
+    raw = f"{task['date']}|{task['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date_iso, task_id = raw.split("|", 1)
+        date_cls.fromisoformat(date_iso)
+        ObjectId(task_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError, InvalidId):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    return date_iso, task_id
+
+
+def ndjson_line(task: dict) -> bytes:
+    line = {field: task.get(field) for field in TASK_OUT_FIELDS}
+    return (json.dumps(line, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+async def stream_ndjson(rows: AsyncIterator[dict]) -> AsyncIterator[bytes]:
+    async for task in rows:
+        yield ndjson_line(task)
+
+
+def set_next_cursor(response: Response, result: list[dict], limit: Optional[int]):
+    if limit and len(result) == limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(result[-1])
+
 
 @router.post("",
              status_code=status.HTTP_201_CREATED,
@@ -26,12 +67,14 @@ async def create_task(
     payload: TaskCreate,
     tasks: TasksRepository = Depends(get_tasks_repo),
     cache=Depends(get_cache_service),
+    reminders: ReminderQueue = Depends(get_reminder_queue),
     user=Depends(get_current_user),
 ):
     payload = payload.model_dump()
     created_task = await tasks.create(user['id'], payload)
 
     await invalidate_user_cache(user["id"], resource="tasks", cache=cache)
+    await reminders.schedule([created_task])
 
     logger.info("Task created, cache invalidated", extra={
         "method": request.method,
@@ -51,13 +94,22 @@ async def list_tasks(
     date: Optional[date_cls] = Query(default=None),
     type: Optional[str] = Query(default=None),
     q: Optional[str] = Query(default=None),
+    limit: Optional[int] = Query(default=None, ge=1, le=1000),
+    after: Optional[str] = Query(default=None),
     cache=Depends(get_cache_service)
 ):
-    response.headers['X-Cache'] = 'MISS'
-
-    if request.headers.get('cache-control') == 'no-cache':
-        result = await tasks.list(user['id'], date_eq=date, type_eq=type, q=q)
-        return [TaskOut.model_validate(task) for task in result]
+    after_key = decode_cursor(after) if after else None
+
+    # Задачи отдаются как dict: валидацию и сериализацию один раз выполняет response_model
+    if NDJSON_MEDIA_TYPE in request.headers.get('accept', ''):
+        if limit:
+            # Страница ограничена limit: читаем её целиком, чтобы отдать X-Next-Cursor в заголовке
+            page = await tasks.list(user['id'], date_eq=date, type_eq=type, q=q, limit=limit, after=after_key)
+            page_response = Response(b"".join(ndjson_line(task) for task in page), media_type=NDJSON_MEDIA_TYPE)
+            set_next_cursor(page_response, page, limit)
+            return page_response
+        rows = tasks.iter(user['id'], date_eq=date, type_eq=type, q=q, after=after_key)
+        return StreamingResponse(stream_ndjson(rows), media_type=NDJSON_MEDIA_TYPE)
 
     query_params = dict()
     if date:
@@ -66,33 +118,70 @@ async def list_tasks(
         query_params['type'] = type
     if q:
         query_params['q'] = q
+    if limit:
+        query_params['limit'] = limit
+    if after:
+        query_params['after'] = after
 
     method = request.method
     path = request.url.path
-    cached_response, is_hit = await get_cached_response(user["id"], method, path, query_params, cache=cache)
+    # Версия читается до загрузки из БД: отданные данные не старее, чем ETag
+    etag_parts = (method, path, sorted(query_params.items()))
+    etag = await get_resource_etag(user["id"], cache, "tasks", *etag_parts)
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    response.headers['X-Cache'] = 'MISS'
 
-    if is_hit:
-        response.headers['X-Cache'] = 'HIT'
-        result = [TaskOut.model_validate(task) for task in cached_response]
+    if request.headers.get('cache-control') == 'no-cache':
+        result = await tasks.list(user['id'], date_eq=date, type_eq=type, q=q, limit=limit, after=after_key)
+        if etag:
+            response.headers['ETag'] = etag
+        set_next_cursor(response, result, limit)
         return result
 
-    result = await tasks.list(user['id'], date_eq=date, type_eq=type, q=q)
-
-    await set_cached_response(user["id"], method, path, query_params, result, settings.CACHE_TTL_TASKS, cache=cache)
+    result, cache_status, generation = await get_or_set_cached_response(
+        user["id"], method, path, query_params,
+        loader=lambda: tasks.list(user['id'], date_eq=date, type_eq=type, q=q, limit=limit, after=after_key),
+        ttl=settings.CACHE_TTL_TASKS,
+        cache=cache
+    )
+    response.headers['X-Cache'] = cache_status
+    # ETag строится из поколения отданной записи, а не текущего: копия L1 в другом воркере или запись,
+    # ещё не удалённая инвалидацией, не получит ETag новой версии.
+    # Устаревший (SWR) ответ заведомо старше текущей версии, поэтому уходит без ETag
+    if cache_status == 'STALE':
+        response.headers['Cache-Control'] = 'no-cache'
+    elif generation is not None:
+        response.headers['ETag'] = make_resource_etag(user["id"], "tasks", generation, *etag_parts)
 
     logger.info("Request completed", extra={
         "method": request.method,
         "path": request.url.path,
         "status": 200,
     })
-    return [TaskOut.model_validate(task) for task in result]
+    set_next_cursor(response, result, limit)
+    return result
+
+
+@router.get("/search",
+            response_model=list[TaskOut])
+async def search_tasks(
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=20, ge=1, le=100),
+    tasks: TasksRepository = Depends(get_tasks_repo),
+    user=Depends(get_current_user),
+):
+    return await tasks.search(user['id'], q, limit=limit)
 
 
 @router.get("/{task_id}",
             response_model=TaskOut)
 async def get_task(
+        request: Request,
+        response: Response,
         task_id: str,
         tasks: TasksRepository = Depends(get_tasks_repo),
+        cache=Depends(get_cache_service),
         user=Depends(get_current_user)
 ):
     try:
@@ -100,6 +189,8 @@ async def get_task(
     except (InvalidId, TypeError):
         raise HTTPException(status_code=404, detail='Task is not found')
 
+    # Версия читается до загрузки задачи, чтобы отданные данные были не старее ETag
+    etag = await get_resource_etag(user["id"], cache, "tasks", "task", task_id)
     result = await tasks.get(task_id)
 
     if not result:
@@ -107,6 +198,11 @@ async def get_task(
     if result['user_id'] != user['id']:
         raise HTTPException(status_code=403, detail='Access denied')
 
+    # ETag задачи привязан к версии всех задач пользователя; 304 — только после проверки владельца
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    if etag:
+        response.headers['ETag'] = etag
     return TaskOut.model_validate(result)
 
 
@@ -118,6 +214,7 @@ async def update_task(
     patch: TaskUpdate,
     tasks: TasksRepository = Depends(get_tasks_repo),
     cache=Depends(get_cache_service),
+    reminders: ReminderQueue = Depends(get_reminder_queue),
     user=Depends(get_current_user),
 ):
     check_task = await tasks.get(task_id)
@@ -136,6 +233,7 @@ async def update_task(
     result = await tasks.update(task_id, payload)
 
     await invalidate_user_cache(user["id"], resource="tasks", cache=cache)
+    await reminders.schedule([result])
 
     logger.info("Task updated, cache invalidated", extra={
         "method": request.method,
@@ -152,6 +250,7 @@ async def delete_task(
         task_id: str,
         tasks: TasksRepository = Depends(get_tasks_repo),
         cache=Depends(get_cache_service),
+        reminders: ReminderQueue = Depends(get_reminder_queue),
         user=Depends(get_current_user)):
     check_task = await tasks.get(task_id)
 
@@ -163,6 +262,7 @@ async def delete_task(
     await tasks.delete(task_id)
 
     await invalidate_user_cache(user["id"], resource="tasks", cache=cache)
+    await reminders.cancel([task_id])
 
     logger.info("Task deleted, cache invalidated", extra={
         "method": request.method,
@@ -0,0 +1,85 @@
+import json
+import zlib
+from typing import Any, Protocol
+
+from src.app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Заголовок записи: версия формата, id кодека, флаг сжатия.
+# Записи без заголовка (старый формат) — это сырой JSON, они читаются как раньше.
+FORMAT_VERSION = 1
+COMPRESSION_NONE = ord("-")
+COMPRESSION_ZLIB = ord("z")
+
+
+class CacheCodec(Protocol):
+    codec_id: int
+    def dumps(self, value: Any) -> bytes: ...
+    def loads(self, data: bytes) -> Any: ...
+
+
+class JsonCodec(CacheCodec):
+    codec_id = ord("j")
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(CacheCodec):
+    codec_id = ord("o")
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+CODECS: dict[int, CacheCodec] = {JsonCodec.codec_id: JsonCodec()}
+if orjson is not None:
+    CODECS[OrjsonCodec.codec_id] = OrjsonCodec()
+
+CODECS_BY_NAME: dict[str, CacheCodec] = {
+    "json": CODECS[JsonCodec.codec_id],
+    "orjson": CODECS.get(OrjsonCodec.codec_id, CODECS[JsonCodec.codec_id]),
+}
+
+
+def encode_entry_sized(value: Any) -> tuple[bytes, int]:
+    # Вторым элементом — длина несжатого payload: по ней L1 оценивает размер объекта в памяти
+    codec = CODECS_BY_NAME.get(settings.CACHE_CODEC, CODECS[JsonCodec.codec_id])
+    payload = codec.dumps(value)
+    payload_size = len(payload)
+    compression = COMPRESSION_NONE
+    if payload_size >= settings.CACHE_COMPRESS_MIN_BYTES:
+        payload = zlib.compress(payload, settings.CACHE_COMPRESS_LEVEL)
+        compression = COMPRESSION_ZLIB
+    return bytes((FORMAT_VERSION, codec.codec_id, compression)) + payload, payload_size
+
+
+def encode_entry(value: Any) -> bytes:
+    return encode_entry_sized(value)[0]
+
+
+def decode_entry_sized(data: bytes) -> tuple[Any, int]:
+    if data[:1] != bytes((FORMAT_VERSION,)):
+        return json.loads(data), len(data)
+    codec = CODECS.get(data[1])
+    if codec is None:
+        raise ValueError(f"Unknown cache codec {data[1]!r}")
+    payload = data[3:]
+    if data[2] == COMPRESSION_ZLIB:
+        payload = zlib.decompress(payload)
+    return codec.loads(payload), len(payload)
+
+
+def decode_entry(data: bytes) -> Any:
+    return decode_entry_sized(data)[0]
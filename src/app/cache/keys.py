@@ -1,13 +1,79 @@
 import hashlib
+from typing import Optional
 from src.app.core.config import settings
 
 
-def make_cache_key(user_id, method, path, query_params: dict):
+def make_cache_key(user_id, method, path, query_params: dict, generation: Optional[int] = None):
     sorted_params = sorted(query_params.items())
     request_str = "&".join(f"{key}={value}" for key, value in sorted_params)
     query_hash = hashlib.sha256(request_str.encode()).hexdigest()[:16]
+    if generation is not None:
+        return f"cache:{settings.APP_ENV}:{user_id}:{method}:{path}:g{generation}:{query_hash}"
     return f"cache:{settings.APP_ENV}:{user_id}:{method}:{path}:{query_hash}"
 
 
+def make_stale_cache_key(user_id, method, path, query_params: dict):
+    return "cache_stale" + make_cache_key(user_id, method, path, query_params)[len("cache"):]
+
+
+def make_cache_lock_key(user_id, method, path, query_params: dict):
+    return "cache_lock" + make_cache_key(user_id, method, path, query_params)[len("cache"):]
+
+
 def make_cache_index_key(user_id, resource: str = "tasks"):
     return f"cache_index:{settings.APP_ENV}:{user_id}:{resource}"
+
+
+def make_cache_generation_key(user_id, resource: str = "tasks"):
+    return f"cache_gen:{settings.APP_ENV}:{user_id}:{resource}"
+
+
+def make_user_cache_key(user_id):
+    return f"user:{settings.APP_ENV}:{user_id}"
+
+
+def make_cache_invalidation_channel():
+    return f"cache_invalidate:{settings.APP_ENV}"
+
+
+def make_upstream_cache_key(source: str, url: str, params: dict):
+    sorted_params = sorted(params.items())
+    request_str = url + "?" + "&".join(f"{key}={value}" for key, value in sorted_params)
+    request_hash = hashlib.sha256(request_str.encode()).hexdigest()[:16]
+    return f"upstream:{settings.APP_ENV}:{source}:{request_hash}"
+
+
+def make_reminder_queue_key():
+    return f"reminders:{settings.APP_ENV}"
+
+
+def make_reminder_sent_key(task_id: str, date_iso: str):
+    return f"reminder_sent:{settings.APP_ENV}:{task_id}:{date_iso}"
+
+
+def make_reminder_backfill_key():
+    return f"reminders_backfill:{settings.APP_ENV}"
+
+
+def make_title_ngrams_backfill_key():
+    return f"title_ngrams_backfill:{settings.APP_ENV}"
+
+
+def make_scheduler_lease_key():
+    return f"scheduler_leader:{settings.APP_ENV}"
+
+
+def make_import_queue_key():
+    return f"import_jobs:{settings.APP_ENV}"
+
+
+def make_import_job_key(job_id: str):
+    return f"import_job:{settings.APP_ENV}:{job_id}"
+
+
+def make_import_processing_key(owner: str):
+    return f"import_jobs_processing:{settings.APP_ENV}:{owner}"
+
+
+def make_import_worker_key(owner: str):
+    return f"import_worker:{settings.APP_ENV}:{owner}"
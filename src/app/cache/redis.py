@@ -1,52 +1,195 @@
-import json
+import asyncio
 import logging
-from json import JSONDecodeError
+import time
+import uuid
+import zlib
 from typing import Optional
 import redis.asyncio as aioredis
 from redis import RedisError
 from src.app.core.config import settings
-from src.app.cache.keys import make_cache_index_key
+from src.app.core.metrics import register_collector
+from src.app.cache.keys import make_cache_generation_key, make_cache_index_key, make_cache_invalidation_channel
+from src.app.cache.codec import decode_entry, decode_entry_sized, encode_entry, encode_entry_sized
+from src.app.cache.local import LocalCache
 
 
 logger = logging.getLogger("cache")
 
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
 
 class RedisCache:
+    # Счётчики общие для всех экземпляров воркера: экземпляр создаётся на каждый запрос
+    stats: dict[str, dict[str, int]] = {
+        "l1": {"hits": 0, "misses": 0},
+        "l2": {"hits": 0, "misses": 0, "errors": 0},
+    }
 
-    def __init__(self, client: aioredis.Redis):
+    def __init__(self, client: aioredis.Redis, local: Optional[LocalCache] = None):
         self.client = client
+        self.local = local
+
+    @property
+    def uses_generations(self) -> bool:
+        return settings.CACHE_INVALIDATION_STRATEGY == "generation"
+
+    async def get_generation(self, user_id: str, resource: str = "tasks") -> Optional[int]:
+        # Без Redis поколение неизвестно: вызывающий код просто работает мимо кэша
+        generation_key = make_cache_generation_key(user_id, resource)
+        try:
+            generation = await self.client.get(generation_key)
+            if generation is None:
+                # Счётчик стартует с текущего времени, а не с 0: после потери данных Redis
+                # новые поколения (и ETag'и на их основе) не совпадут со старыми
+                await self.client.set(generation_key, time.time_ns() // 1000, nx=True)
+                generation = await self.client.get(generation_key)
+            return int(generation)
+        except (RedisError, ValueError, TypeError, AttributeError):
+            self.stats["l2"]["errors"] += 1
+            return None
 
-    async def get(self, key: str) -> Optional[dict]:
+    async def get(self, key: str, user_id: Optional[str] = None, resource: str = "tasks") -> Optional[dict]:
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not None:
+                self.stats["l1"]["hits"] += 1
+                return value
+            self.stats["l1"]["misses"] += 1
         try:
             data = await self.client.get(key)
-            return json.loads(data)
-        except (RedisError, JSONDecodeError, TypeError, AttributeError):
-            pass
+            if data is None:
+                self.stats["l2"]["misses"] += 1
+                return None
+            value, payload_size = decode_entry_sized(data)
+            self.stats["l2"]["hits"] += 1
+            if self.local is not None and user_id is not None:
+                self.local.set(key, value, self.local.max_ttl, payload_size, user_id, resource)
+            return value
+        except (RedisError, ValueError, zlib.error, TypeError, AttributeError):
+            self.stats["l2"]["errors"] += 1
 
     async def set(self, key: str, value: dict, ttl: int, user_id: str, resource: str = "tasks"):
+        await self.set_many([(key, value, ttl)], user_id, resource)
+
+    async def set_many(self, entries: list[tuple[str, dict, int]], user_id: str, resource: str = "tasks"):
+        encoded = []
+        for key, value, ttl in entries:
+            data, payload_size = encode_entry_sized(value)
+            if len(data) > settings.CACHE_MAX_BYTES:
+                logger.warning(f"Cache entry {key} skipped: {len(data)} bytes exceeds CACHE_MAX_BYTES")
+                continue
+            encoded.append((key, value, ttl, data, payload_size))
+        if not encoded:
+            return
+
+        index_key = make_cache_index_key(user_id, resource)
         try:
-            data_to_cache = json.dumps(value)
-            data_size = len(data_to_cache.encode("utf-8"))
-            if data_size > settings.CACHE_MAX_BYTES:
-                return
-            await self.client.set(key, json.dumps(value), ex=ttl)
+            # Значения и индекс пишутся одной транзакцией MULTI/EXEC за один round trip
+            async with self.client.pipeline(transaction=True) as pipe:
+                for key, _, ttl, data, _ in encoded:
+                    await pipe.set(key, data, ex=ttl)
+                if not self.uses_generations:
+                    await pipe.sadd(index_key, *(key for key, _, _, _, _ in encoded))
+                    await pipe.expire(index_key, max(ttl for _, _, ttl, _, _ in encoded))
+                await pipe.execute()
+        except (RedisError, AttributeError, TypeError):
+            self.stats["l2"]["errors"] += 1
+            return
+        if self.local is not None:
+            for key, value, ttl, _, payload_size in encoded:
+                self.local.set(key, value, ttl, payload_size, user_id, resource)
+
+    async def get_stale(self, key: str) -> Optional[dict]:
+        try:
+            data = await self.client.get(key)
+            return decode_entry(data) if data is not None else None
+        except (RedisError, ValueError, zlib.error, TypeError, AttributeError):
+            self.stats["l2"]["errors"] += 1
+            return None
 
-            index_key = make_cache_index_key(user_id, resource)
-            await self.client.sadd(index_key, key)
-            await self.client.expire(index_key, ttl)
+    async def set_stale(self, key: str, value: dict, ttl: int):
+        # Копия для stale-while-revalidate не попадает в индекс и переживает инвалидацию
+        data = encode_entry(value)
+        if len(data) > settings.CACHE_MAX_BYTES:
+            return
+        try:
+            await self.client.set(key, data, ex=ttl)
         except (RedisError, AttributeError, TypeError):
-            pass
+            self.stats["l2"]["errors"] += 1
+
+    async def acquire_lock(self, key: str, ttl_ms: int) -> Optional[str]:
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.client.set(key, token, nx=True, px=ttl_ms)
+        except (RedisError, AttributeError, TypeError):
+            # Без Redis координировать воркеры нечем: считаем, что блокировка наша
+            self.stats["l2"]["errors"] += 1
+            return token
+        return token if acquired else None
+
+    async def release_lock(self, key: str, token: str):
+        try:
+            await self.client.eval(RELEASE_LOCK_SCRIPT, 1, key, token)
+        except (RedisError, AttributeError, TypeError):
+            self.stats["l2"]["errors"] += 1
 
     async def invalidate_user_cache(self, user_id: str, resource: str = "tasks"):
         index_key = make_cache_index_key(user_id, resource)
+        if self.local is not None:
+            self.local.invalidate(user_id, resource)
         try:
-            cache_keys = await self.client.smembers(index_key)
-            async with self.client.pipeline() as pipe:
-                if cache_keys:
-                    await pipe.delete(*cache_keys)
-                await pipe.delete(index_key)
-                await pipe.execute()
+            # Поколение — это и версия данных пользователя для ETag, поэтому растёт при любой стратегии.
+            # O(1) для стратегии generation: ключи старого поколения больше не читаются и истекают по TTL.
+            # Счётчик живёт без TTL, иначе после сброса могли бы ожить старые ключи и ETag'и
+            await self.client.incr(make_cache_generation_key(user_id, resource))
+            if not self.uses_generations:
+                cache_keys = await self.client.smembers(index_key)
+                async with self.client.pipeline() as pipe:
+                    if cache_keys:
+                        await pipe.delete(*cache_keys)
+                    await pipe.delete(index_key)
+                    await pipe.execute()
+            if self.local is not None:
+                # Остальные воркеры сбрасывают свой L1 по сообщению из pub/sub
+                await self.client.publish(make_cache_invalidation_channel(), f"{user_id}:{resource}")
             return
         except Exception:
             logger.error(f"Failed to invalidate cache for user {user_id}", exc_info=True)
             return
+
+
+def _render_cache_stats():
+    yield "# HELP cache_requests_total RedisCache lookups by tier and result"
+    yield "# TYPE cache_requests_total counter"
+    for tier, counters in RedisCache.stats.items():
+        for result, value in counters.items():
+            yield f'cache_requests_total{{tier="{tier}",result="{result}"}} {value}'
+
+
+register_collector(_render_cache_stats)
+
+
+async def listen_invalidations(client: aioredis.Redis, local: LocalCache):
+    channel = make_cache_invalidation_channel()
+    while True:
+        try:
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(channel)
+                # Пока не были подписаны, сообщения могли потеряться: начинаем с пустого L1
+                local.clear()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    user_id, _, resource = message["data"].decode().partition(":")
+                    local.invalidate(user_id, resource)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.error("Cache invalidation listener failed, resubscribing", exc_info=True)
+            local.clear()
+            await asyncio.sleep(1)
@@ -1,6 +1,53 @@
-from typing import Optional
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Optional
 from src.app.cache.redis import RedisCache
-from src.app.cache.keys import make_cache_key
+from src.app.cache.keys import make_cache_key, make_cache_lock_key, make_stale_cache_key
+from src.app.core.config import settings
+
+
+logger = logging.getLogger("cache")
+
+# Загрузки, выполняющиеся в этом воркере прямо сейчас: ключ -> future с результатом
+_inflight: dict[str, asyncio.Future] = {}
+
+
+async def _resolve_cache_key(
+        user_id: str,
+        method: str,
+        path: str,
+        query_params: dict,
+        cache: RedisCache,
+        resource: str = "tasks"
+) -> tuple[Optional[str], Optional[int]]:
+    # Ключ и поколение, в котором он читается/пишется; без поколения (Redis недоступен) кэш не используется
+    generation = await cache.get_generation(user_id, resource)
+    if generation is None:
+        return None, None
+    key_generation = generation if cache.uses_generations else None
+    return make_cache_key(user_id, method, path, query_params, key_generation), generation
+
+
+def _unwrap_entry(entry: Any) -> tuple[Any, Optional[int]]:
+    # Значение хранится вместе с поколением, в котором оно загружено: по нему строится ETag отданного ответа
+    if not isinstance(entry, dict) or "value" not in entry:
+        return None, None
+    return entry["value"], entry.get("generation")
+
+
+async def _get_cached_entry(
+        user_id: str,
+        method: str,
+        path: str,
+        query_params: dict,
+        cache: RedisCache,
+        resource: str = "tasks"
+) -> tuple[Any, Optional[int]]:
+    cache_key, _ = await _resolve_cache_key(user_id, method, path, query_params, cache, resource)
+    if cache_key is None:
+        return None, None
+    return _unwrap_entry(await cache.get(cache_key, user_id, resource))
 
 
 async def get_cached_response(
@@ -9,15 +56,13 @@ async def get_cached_response(
         path: str,
         query_params: dict,
         cache: RedisCache,
-        force_refresh: bool = False
+        force_refresh: bool = False,
+        resource: str = "tasks"
 ) -> tuple[Optional[dict], bool]:
     if force_refresh:
         return None, False
-    cache_key = make_cache_key(user_id, method, path, query_params)
-    cached_value = await cache.get(cache_key)
-    is_hit = False
-    if cached_value:
-        is_hit = True
+    cached_value, _ = await _get_cached_entry(user_id, method, path, query_params, cache, resource)
+    is_hit = cached_value is not None
     return cached_value, is_hit
 
 
@@ -31,8 +76,10 @@ async def set_cached_response(
         cache: RedisCache,
         resource: str = "tasks"
 ):
-    cache_key = make_cache_key(user_id, method, path, query_params)
-    await cache.set(cache_key, value, ttl, user_id, resource)
+    cache_key, generation = await _resolve_cache_key(user_id, method, path, query_params, cache, resource)
+    if cache_key is None:
+        return
+    await cache.set(cache_key, {"generation": generation, "value": value}, ttl, user_id, resource)
 
 
 async def invalidate_user_cache(
@@ -40,4 +87,124 @@ async def invalidate_user_cache(
         cache: RedisCache,
         resource: str = "tasks"
 ):
-    return await cache.invalidate_user_cache(user_id, resource)
\ No newline at end of file
+    return await cache.invalidate_user_cache(user_id, resource)
+
+
+async def get_resource_etag(
+        user_id: str,
+        cache: RedisCache,
+        resource: str = "tasks",
+        *parts: Any
+) -> Optional[str]:
+    # Сильный ETag из версии данных пользователя: проверка If-None-Match стоит один GET в Redis
+    generation = await cache.get_generation(user_id, resource)
+    if generation is None:
+        return None
+    return make_resource_etag(user_id, resource, generation, *parts)
+
+
+def make_resource_etag(user_id: str, resource: str, generation: int, *parts: Any) -> str:
+    raw = ":".join(str(part) for part in (user_id, resource, generation, *parts))
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def _start_flight(key: str, factory: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+    # Сильная ссылка на задачу живёт в _inflight до её завершения (event loop держит только слабую),
+    # а _finish_flight забирает исключение: фоновое обновление не теряется и не пишет "never retrieved"
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(factory())
+        _inflight[key] = future
+        future.add_done_callback(lambda f: _finish_flight(key, f))
+    return future
+
+
+def _single_flight(key: str, factory: Callable[[], Awaitable[Any]]) -> Awaitable[Any]:
+    # shield: отмена одного ожидающего запроса не должна отменять загрузку для остальных
+    return asyncio.shield(_start_flight(key, factory))
+
+
+def _finish_flight(key: str, future: asyncio.Future):
+    _inflight.pop(key, None)
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Cache refresh failed for {key}: {future.exception()}")
+
+
+async def _load_and_store(
+        user_id: str,
+        method: str,
+        path: str,
+        query_params: dict,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int,
+        cache: RedisCache,
+        resource: str
+) -> tuple[Any, Optional[int]]:
+    lock_key = make_cache_lock_key(user_id, method, path, query_params)
+    token = await cache.acquire_lock(lock_key, settings.CACHE_LOCK_TTL_MS)
+    if token is None:
+        # Ключ уже пересчитывает другой воркер: ждём его результат в кэше, но не дольше жизни блокировки
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.CACHE_LOCK_TTL_MS / 1000
+        while loop.time() < deadline:
+            await asyncio.sleep(settings.CACHE_LOCK_POLL_MS / 1000)
+            cached_value, generation = await _get_cached_entry(user_id, method, path, query_params, cache, resource)
+            if cached_value is not None:
+                return cached_value, generation
+    try:
+        # Ключ и поколение фиксируются до загрузки: если инвалидация случится во время loader(),
+        # результат ляжет в старое поколение (или, для стратегии index, не запишется) и не будет отдан как HIT
+        cache_key, generation = await _resolve_cache_key(user_id, method, path, query_params, cache, resource)
+        value = await loader()
+        entry = {"generation": generation, "value": value}
+        if cache_key is not None and (cache.uses_generations
+                                      or generation == await cache.get_generation(user_id, resource)):
+            await cache.set(cache_key, entry, ttl, user_id, resource)
+        if settings.CACHE_SWR_ENABLED:
+            await cache.set_stale(make_stale_cache_key(user_id, method, path, query_params), entry,
+                                  ttl + settings.CACHE_STALE_TTL_SECONDS)
+        return value, generation
+    finally:
+        if token is not None:
+            await cache.release_lock(lock_key, token)
+
+
+async def get_or_set_cached_response(
+        user_id: str,
+        method: str,
+        path: str,
+        query_params: dict,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int,
+        cache: RedisCache,
+        resource: str = "tasks"
+) -> tuple[Any, str, Optional[int]]:
+    # Возвращает значение, статус для X-Cache (HIT, STALE или MISS) и поколение, в котором значение загружено.
+    # На промахе в каждом ключе одна загрузка на воркер (single-flight) и одна на кластер (Redis-блокировка)
+    cached_value, generation = await _get_cached_entry(user_id, method, path, query_params, cache, resource)
+    if cached_value is not None:
+        return cached_value, "HIT", generation
+
+    flight_key = make_cache_key(user_id, method, path, query_params)
+
+    def refresh():
+        return _load_and_store(user_id, method, path, query_params, loader, ttl, cache, resource)
+
+    if settings.CACHE_SWR_ENABLED:
+        stale_value, generation = _unwrap_entry(
+            await cache.get_stale(make_stale_cache_key(user_id, method, path, query_params))
+        )
+        if stale_value is not None:
+            # Обновление в фоне: ответ не ждёт его, поэтому без shield-обёртки, которую никто не ожидает
+            _start_flight(flight_key, refresh)
+            return stale_value, "STALE", generation
+
+    value, generation = await _single_flight(flight_key, refresh)
+    return value, "MISS", generation
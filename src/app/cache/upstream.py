@@ -0,0 +1,125 @@
+import logging
+import time
+import zlib
+from typing import Any, Optional
+
+import httpx
+import redis.asyncio as aioredis
+from redis import RedisError
+
+from src.app.core.config import settings
+from src.app.core.metrics import importer_fetch_duration
+from src.app.cache.codec import decode_entry, encode_entry
+from src.app.cache.keys import make_upstream_cache_key
+from src.app.external.resilience import upstream_policy
+
+
+logger = logging.getLogger("cache")
+
+UPSTREAM_TTLS = {
+    "nager": settings.UPSTREAM_TTL_NAGER,
+    "open-meteo": settings.UPSTREAM_TTL_OPEN_METEO,
+    "spaceflight": settings.UPSTREAM_TTL_SPACEFLIGHT,
+}
+
+
+class UpstreamCache:
+
+    def __init__(self, client: aioredis.Redis):
+        self.client = client
+
+    async def _load(self, key: str) -> Optional[dict]:
+        try:
+            data = await self.client.get(key)
+            return decode_entry(data) if data is not None else None
+        except (RedisError, ValueError, zlib.error, TypeError, AttributeError):
+            return None
+
+    async def _store(self, key: str, entry: dict, ttl: int):
+        # Запись живёт дольше TTL свежести, чтобы после него можно было сделать условный запрос
+        try:
+            await self.client.set(key, encode_entry(entry), ex=ttl + settings.UPSTREAM_REVALIDATE_SECONDS)
+        except (RedisError, AttributeError, TypeError):
+            pass
+
+    async def get_json(
+            self,
+            http_client: httpx.AsyncClient,
+            source: str,
+            url: str,
+            params: Optional[dict[str, Any]] = None
+    ) -> Any:
+        ttl = UPSTREAM_TTLS.get(source, settings.CACHE_TTL_SECONDS)
+        key = make_upstream_cache_key(source, url, params or {})
+        entry = await self._load(key)
+        now = time.time()
+
+        if entry and now - entry["fetched_at"] < ttl:
+            return entry["body"]
+
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = await resilient_get(http_client, source, url, params, headers)
+        if entry and response.status_code == 304:
+            entry["fetched_at"] = now
+            await self._store(key, entry, ttl)
+            return entry["body"]
+        response.raise_for_status()
+
+        body = response.json()
+        await self._store(key, {
+            "body": body,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "fetched_at": now,
+        }, ttl)
+        return body
+
+
+async def timed_get(
+        http_client: httpx.AsyncClient,
+        source: str,
+        url: str,
+        params: Optional[dict[str, Any]] = None,
+        headers: Optional[dict[str, str]] = None
+) -> httpx.Response:
+    start = time.perf_counter()
+    status = "error"
+    try:
+        response = await http_client.get(url, params=params, headers=headers)
+        status = str(response.status_code)
+        return response
+    except httpx.TimeoutException:
+        status = "timeout"
+        raise
+    finally:
+        importer_fetch_duration.observe(time.perf_counter() - start, source, status)
+
+
+async def resilient_get(
+        http_client: httpx.AsyncClient,
+        source: str,
+        url: str,
+        params: Optional[dict[str, Any]] = None,
+        headers: Optional[dict[str, str]] = None
+) -> httpx.Response:
+    # Каждая попытка (повтор или hedge) меряется отдельно в importer_fetch_duration
+    return await upstream_policy(source).get(lambda: timed_get(http_client, source, url, params, headers))
+
+
+async def fetch_json(
+        http_client: httpx.AsyncClient,
+        source: str,
+        url: str,
+        params: Optional[dict[str, Any]] = None,
+        upstream_cache: Optional[UpstreamCache] = None
+) -> Any:
+    if upstream_cache is not None:
+        return await upstream_cache.get_json(http_client, source, url, params)
+    response = await resilient_get(http_client, source, url, params)
+    response.raise_for_status()
+    return response.json()
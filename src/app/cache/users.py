@@ -0,0 +1,49 @@
+import zlib
+from typing import Any, Optional
+
+import redis.asyncio as aioredis
+from redis import RedisError
+
+from src.app.core.config import settings
+from src.app.cache.codec import decode_entry_sized, encode_entry_sized
+from src.app.cache.keys import make_user_cache_key
+from src.app.cache.local import LocalCache
+
+
+# В кэш попадают только публичные поля: хэш пароля не должен покидать MongoDB ради аутентификации
+CACHED_USER_FIELDS = ("id", "email")
+
+
+class UserCache:
+    # Двухуровневый кэш пользователей для get_current_user: память воркера, затем Redis
+    # Кэшируются только id и email, а изменяющих их эндпоинтов нет, поэтому записи просто истекают по TTL
+
+    def __init__(self, client: aioredis.Redis, local: LocalCache):
+        self.client = client
+        self.local = local
+
+    async def get(self, user_id: str) -> Optional[dict[str, Any]]:
+        key = make_user_cache_key(user_id)
+        user = self.local.get(key)
+        if user is not None:
+            return user
+        try:
+            data = await self.client.get(key)
+            if data is None:
+                return None
+            user, payload_size = decode_entry_sized(data)
+        except (RedisError, ValueError, zlib.error, TypeError, AttributeError):
+            return None
+        self.local.set(key, user, settings.AUTH_USER_CACHE_LOCAL_TTL, payload_size, user_id, "user")
+        return user
+
+    async def set(self, user: dict[str, Any]) -> dict[str, Any]:
+        public_user = {field: user.get(field) for field in CACHED_USER_FIELDS}
+        key = make_user_cache_key(public_user["id"])
+        data, payload_size = encode_entry_sized(public_user)
+        self.local.set(key, public_user, settings.AUTH_USER_CACHE_LOCAL_TTL, payload_size, public_user["id"], "user")
+        try:
+            await self.client.set(key, data, ex=settings.AUTH_USER_CACHE_TTL)
+        except (RedisError, AttributeError, TypeError):
+            pass
+        return public_user
@@ -12,13 +12,34 @@ load_dotenv()
 class Settings:
     MONGO_URI: str = os.getenv("MONGO_URI", "mongodb://localhost:27017")
     MONGO_DB_NAME: str = os.getenv("MONGO_DB_NAME", "planner")
+    # mongo | memory: задачи в памяти процесса для однонодовых установок и бенчмарков
+    TASKS_BACKEND: str = os.getenv("TASKS_BACKEND", "mongo")
+    TASKS_SNAPSHOT_PATH: str = os.getenv("TASKS_SNAPSHOT_PATH", "")
+    TASKS_SNAPSHOT_INTERVAL_SECONDS: int = int(os.getenv("TASKS_SNAPSHOT_INTERVAL_SECONDS", 300))
+    MONGO_PROFILING_ENABLED: bool = os.getenv("MONGO_PROFILING_ENABLED", "true").lower() == "true"
+    MONGO_SLOW_QUERY_MS: float = float(os.getenv("MONGO_SLOW_QUERY_MS", 100))
+    MONGO_PROFILE_TOP_N: int = int(os.getenv("MONGO_PROFILE_TOP_N", 20))
+    MONGO_PROFILE_WINDOW_SECONDS: int = int(os.getenv("MONGO_PROFILE_WINDOW_SECONDS", 3600))
+    MONGO_PROFILE_MAX_SHAPES: int = int(os.getenv("MONGO_PROFILE_MAX_SHAPES", 1000))
     JWT_SECRET: str = os.getenv("JWT_SECRET", "dev-secret-change-me-32-characters-minimum")
     JWT_ALG: str = os.getenv("JWT_ALG", "HS256")
     JWT_EXPIRE_MINUTES: int = int(os.getenv("JWT_EXPIRE_MINUTES", "60"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_QUEUE_SIZE: int = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 32))
+    AUTH_TOKEN_CACHE_SIZE: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000))
+    AUTH_USER_CACHE_TTL: int = int(os.getenv("AUTH_USER_CACHE_TTL", 300))
+    AUTH_USER_CACHE_LOCAL_TTL: int = int(os.getenv("AUTH_USER_CACHE_LOCAL_TTL", 60))
+    AUTH_USER_CACHE_MAX_BYTES: int = int(os.getenv("AUTH_USER_CACHE_MAX_BYTES", 4194304))
+    ADMIN_EMAILS: frozenset[str] = frozenset(
+        email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()
+    )
     PROJECT_DIR: Path = Path(__file__).resolve().parents[2]
     TEMPLATES_DIR: Path = PROJECT_DIR / "src" / "app" / "templates"
     HTTP_TIMEOUT: int = int(os.getenv("HTTP_TIMEOUT", 10))
     HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", 10))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 5))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     APP_NAME: str = os.getenv("APP_NAME", "studplanner")
     APP_ENV: str = os.getenv("APP_ENV", "dev")
@@ -27,6 +48,33 @@ class Settings:
     CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", 900))
     CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", 1048576))
     CACHE_TTL_PREVIEW: int = int(os.getenv("CACHE_TTL_PREVIEW", 300))
+    CACHE_INVALIDATION_STRATEGY: str = os.getenv("CACHE_INVALIDATION_STRATEGY", "index")  # index | generation
+    CACHE_SWR_ENABLED: bool = os.getenv("CACHE_SWR_ENABLED", "false").lower() == "true"
+    CACHE_STALE_TTL_SECONDS: int = int(os.getenv("CACHE_STALE_TTL_SECONDS", 3600))
+    CACHE_LOCK_TTL_MS: int = int(os.getenv("CACHE_LOCK_TTL_MS", 3000))
+    CACHE_LOCK_POLL_MS: int = int(os.getenv("CACHE_LOCK_POLL_MS", 50))
+    CACHE_CODEC: str = os.getenv("CACHE_CODEC", "orjson")
+    CACHE_COMPRESS_MIN_BYTES: int = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 4096))
+    CACHE_COMPRESS_LEVEL: int = int(os.getenv("CACHE_COMPRESS_LEVEL", 1))
+    CACHE_L1_ENABLED: bool = os.getenv("CACHE_L1_ENABLED", "false").lower() == "true"
+    CACHE_L1_MAX_BYTES: int = int(os.getenv("CACHE_L1_MAX_BYTES", 16777216))
+    CACHE_L1_TTL_SECONDS: int = int(os.getenv("CACHE_L1_TTL_SECONDS", 60))
+    UPSTREAM_CACHE_ENABLED: bool = os.getenv("UPSTREAM_CACHE_ENABLED", "true").lower() == "true"
+    UPSTREAM_TTL_NAGER: int = int(os.getenv("UPSTREAM_TTL_NAGER", 259200))
+    UPSTREAM_TTL_OPEN_METEO: int = int(os.getenv("UPSTREAM_TTL_OPEN_METEO", 600))
+    UPSTREAM_TTL_SPACEFLIGHT: int = int(os.getenv("UPSTREAM_TTL_SPACEFLIGHT", 300))
+    UPSTREAM_REVALIDATE_SECONDS: int = int(os.getenv("UPSTREAM_REVALIDATE_SECONDS", 86400))
+    UPSTREAM_RETRY_ATTEMPTS: int = int(os.getenv("UPSTREAM_RETRY_ATTEMPTS", 3))
+    UPSTREAM_RETRY_BASE_DELAY: float = float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", 0.2))
+    UPSTREAM_RETRY_MAX_DELAY: float = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY", 2.0))
+    UPSTREAM_RETRY_DEADLINE_SECONDS: float = float(os.getenv("UPSTREAM_RETRY_DEADLINE_SECONDS", 15))
+    UPSTREAM_BREAKER_FAILURES: int = int(os.getenv("UPSTREAM_BREAKER_FAILURES", 5))
+    UPSTREAM_BREAKER_OPEN_SECONDS: float = float(os.getenv("UPSTREAM_BREAKER_OPEN_SECONDS", 30))
+    UPSTREAM_HEDGE_ENABLED: bool = os.getenv("UPSTREAM_HEDGE_ENABLED", "false").lower() == "true"
+    UPSTREAM_HEDGE_QUANTILE: float = float(os.getenv("UPSTREAM_HEDGE_QUANTILE", 0.95))
+    UPSTREAM_HEDGE_MIN_DELAY_MS: int = int(os.getenv("UPSTREAM_HEDGE_MIN_DELAY_MS", 50))
+    UPSTREAM_HEDGE_MIN_SAMPLES: int = int(os.getenv("UPSTREAM_HEDGE_MIN_SAMPLES", 20))
+    UPSTREAM_LATENCY_WINDOW: int = int(os.getenv("UPSTREAM_LATENCY_WINDOW", 200))
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
     LOG_FILE_PATH: str = os.getenv("LOG_FILE_PATH", "logs/app.log")
@@ -35,18 +83,36 @@ class Settings:
 
     # Background tasks
     SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    SCHEDULER_LEADER_ELECTION: bool = os.getenv("SCHEDULER_LEADER_ELECTION", "true").lower() == "true"
+    # После падения лидера задачи планировщика переходят к другому воркеру не позже чем через TTL
+    SCHEDULER_LEASE_TTL_SECONDS: float = float(os.getenv("SCHEDULER_LEASE_TTL_SECONDS", 30))
     AUTO_IMPORT_ENABLED: bool = os.getenv("AUTO_IMPORT_ENABLED", "false").lower() == "true"
     AUTO_IMPORT_INTERVAL_MINUTES: int = int(os.getenv("AUTO_IMPORT_INTERVAL_MINUTES", 60))
+    AUTO_IMPORT_BATCH_SIZE: int = int(os.getenv("AUTO_IMPORT_BATCH_SIZE", 500))
+    AUTO_IMPORT_CONCURRENCY: int = int(os.getenv("AUTO_IMPORT_CONCURRENCY", 20))
     CLEANUP_ENABLED: bool = os.getenv("CLEANUP_ENABLED", "true").lower() == "true"
     CLEANUP_INTERVAL_HOURS: int = int(os.getenv("CLEANUP_INTERVAL_HOURS", 24))
     CLEANUP_EXPIRED_DAYS: int = int(os.getenv("CLEANUP_EXPIRED_DAYS", 90))
+    RETENTION_BATCH_SIZE: int = int(os.getenv("RETENTION_BATCH_SIZE", 500))
+    RETENTION_MAX_DOCS_PER_SECOND: float = float(os.getenv("RETENTION_MAX_DOCS_PER_SECOND", 2000))
+    RETENTION_BATCH_PAUSE_MS: int = int(os.getenv("RETENTION_BATCH_PAUSE_MS", 50))
+    RETENTION_MAX_BATCHES_PER_RUN: int = int(os.getenv("RETENTION_MAX_BATCHES_PER_RUN", 0))
+    RETENTION_ARCHIVE_ENABLED: bool = os.getenv("RETENTION_ARCHIVE_ENABLED", "false").lower() == "true"
+    RETENTION_ARCHIVE_COLLECTION: str = os.getenv("RETENTION_ARCHIVE_COLLECTION", "tasks_archive")
     REMINDERS_ENABLED: bool = os.getenv("REMINDERS_ENABLED", "true").lower() == "true"
-    REMINDER_CHECK_INTERVAL_MINUTES: int = int(os.getenv("REMINDER_CHECK_INTERVAL_MINUTES", 15))
+    REMINDER_POLL_SECONDS: float = float(os.getenv("REMINDER_POLL_SECONDS", 1.0))
+    REMINDER_BATCH_SIZE: int = int(os.getenv("REMINDER_BATCH_SIZE", 100))
     REMINDER_BEFORE_MINUTES: int = int(os.getenv("REMINDER_BEFORE_MINUTES", 30))
 
+    # Асинхронные импорты: воркеры в процессе API (0 — только постановка в очередь)
+    IMPORT_JOBS_WORKERS: int = int(os.getenv("IMPORT_JOBS_WORKERS", 4))
+    IMPORT_JOBS_MAX_QUEUE: int = int(os.getenv("IMPORT_JOBS_MAX_QUEUE", 1000))
+    IMPORT_JOB_TTL_SECONDS: int = int(os.getenv("IMPORT_JOB_TTL_SECONDS", 86400))
+
     # DI
     MONGO_POOL_SIZE: int = int(os.getenv("MONGO_POOL_SIZE", 10))
     REDIS_POOL_SIZE: int = int(os.getenv("REDIS_POOL_SIZE", 10))
+    REDIS_POOL_TIMEOUT_SECONDS: float = float(os.getenv("REDIS_POOL_TIMEOUT_SECONDS", 1.0))
 
     @property
     def access_token_timedelta(self) -> timedelta:
@@ -1,57 +1,173 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import httpx
 import redis.asyncio as aioredis
+from redis import RedisError
 from typing import Annotated, Optional
 
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
-from src.app.cache.redis import RedisCache
-from src.app.core.logging import request_id_var
-from src.app.core.security import decode_token
-from src.app.db.repositories import UsersRepository, TasksRepository, MotorTasksRepository, MotorUsersRepository
+from src.app.cache.keys import make_title_ngrams_backfill_key
+from src.app.cache.local import LocalCache
+from src.app.cache.redis import RedisCache, listen_invalidations
+from src.app.cache.upstream import UpstreamCache
+from src.app.cache.users import UserCache
+from src.app.core.http import HttpClientPool
+from src.app.core.logging import user_id_var
+from src.app.core.security import decode_token_cached, shutdown_password_executor
+from src.app.db.profiler import command_profiler
+from src.app.db.repositories import (
+    UsersRepository, TasksRepository, MotorTasksRepository, MotorUsersRepository, InMemoryTasksRepository
+)
 from src.app.core.config import settings
-from src.app.external.nager import NagerImporter
-from src.app.external.weather_open_meteo import WeatherImporter
-from src.app.external.news_spaceflight import NewsImporter
+from src.app.external.nager import NagerImporter, NAGER_BASE_URL
+from src.app.external.weather_open_meteo import WeatherImporter, OPEN_METEO_BASE_URL
+from src.app.external.news_spaceflight import NewsImporter, SPACEFLIGHT_BASE_URL
+from src.app.services.import_jobs import ImportJobQueue
+from src.app.services.reminders import ReminderQueue, consume_reminders
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
 _mongo_client: AsyncIOMotorClient | None = None
 _redis_pool: aioredis.ConnectionPool | None = None
-
-async def init_dependencies():
-    global _mongo_client, _redis_pool
+_redis_background_pool: aioredis.ConnectionPool | None = None
+_http_pool: HttpClientPool | None = None
+_local_cache: LocalCache | None = None
+_local_user_cache = LocalCache(settings.AUTH_USER_CACHE_MAX_BYTES, settings.AUTH_USER_CACHE_LOCAL_TTL)
+_invalidation_listener: asyncio.Task | None = None
+_memory_tasks: InMemoryTasksRepository | None = None
+_snapshot_writer: asyncio.Task | None = None
+_reminder_consumer: asyncio.Task | None = None
+
+# Потребители, которые держат соединение Redis постоянно (кроме воркеров импорта):
+# pub/sub сброса L1, очередь напоминаний, аренда планировщика, heartbeat пула импорта
+BACKGROUND_REDIS_CONSUMERS = 4
+
+async def init_dependencies(import_workers: int = settings.IMPORT_JOBS_WORKERS):
+    global _mongo_client, _redis_pool, _redis_background_pool, _http_pool, _local_cache, _invalidation_listener, \
+        _reminder_consumer
 
     # MongoDB
     _mongo_client = AsyncIOMotorClient(
         settings.MONGO_URI,
-        maxPoolSize=settings.MONGO_POOL_SIZE
+        maxPoolSize=settings.MONGO_POOL_SIZE,
+        event_listeners=[command_profiler] if settings.MONGO_PROFILING_ENABLED else []
     )
-    db = _mongo_client[settings.MONGO_DB_NAME]
-    await db["users"].create_index("email", unique=True)
-    await db["tasks"].create_index([("user_id", 1), ("date", 1)])
-    await db["tasks"].create_index([("user_id", 1), ("type", 1)])
-    await db["tasks"].create_index([("user_id", 1), ("meta.source_id", 1)], unique=True,
-                                   partialFilterExpression={"meta.source_id": {"$exists": True, "$type": 'string'}})
+    await ensure_indexes(_mongo_client[settings.MONGO_DB_NAME])
+    await init_tasks_backend()
 
     # Redis
-    _redis_pool = aioredis.ConnectionPool.from_url(
+    # Пул запросов: при исчерпании запрос ждёт освободившееся соединение до REDIS_POOL_TIMEOUT_SECONDS,
+    # а не получает сразу "Too many connections"
+    _redis_pool = aioredis.BlockingConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_POOL_SIZE,
+        timeout=settings.REDIS_POOL_TIMEOUT_SECONDS
+    )
+    # Долгоживущие потребители (BLMOVE воркеров импорта, pub/sub, опрос напоминаний, аренда) держат
+    # соединение постоянно, поэтому живут в отдельном пуле и не отнимают соединения у запросов
+    _redis_background_pool = aioredis.BlockingConnectionPool.from_url(
         settings.REDIS_URL,
-        max_connections=settings.REDIS_POOL_SIZE
+        max_connections=BACKGROUND_REDIS_CONSUMERS + import_workers
     )
+    await backfill_search_index(_mongo_client[settings.MONGO_DB_NAME], aioredis.Redis(connection_pool=_redis_pool))
+    if settings.CACHE_L1_ENABLED:
+        _local_cache = LocalCache(settings.CACHE_L1_MAX_BYTES, settings.CACHE_L1_TTL_SECONDS)
+        _invalidation_listener = asyncio.create_task(
+            listen_invalidations(await get_background_redis_client(), _local_cache)
+        )
+
+    if settings.REMINDERS_ENABLED:
+        _reminder_consumer = asyncio.create_task(consume_reminders(
+            ReminderQueue(await get_background_redis_client()),
+            await get_tasks_repo(_mongo_client[settings.MONGO_DB_NAME])
+        ))
+
+    # HTTP: заранее создаём по клиенту на каждый upstream; соединения открываются при первом запросе
+    _http_pool = HttpClientPool()
+    for base_url in (NAGER_BASE_URL, OPEN_METEO_BASE_URL, SPACEFLIGHT_BASE_URL):
+        _http_pool.get(httpx.URL(base_url).host)
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    await db["users"].create_index("email", unique=True)
+    await db["tasks"].create_index([("user_id", 1), ("date", 1), ("_id", 1)])
+    await db["tasks"].create_index([("date", 1)])
+    await db["tasks"].create_index([("user_id", 1), ("type", 1)])
+    await db["tasks"].create_index([("user_id", 1), ("meta.source_id", 1)], unique=True,
+                                   partialFilterExpression={"meta.source_id": {"$exists": True, "$type": 'string'}})
+    await db["tasks"].create_index([("user_id", 1), ("title_ngrams", 1)])
+
+
+async def backfill_search_index(db: AsyncIOMotorDatabase, redis: aioredis.Redis):
+    # Разовая миграция на окружение: полный проход по коллекции выполняет один воркер, остальные
+    # видят метку (running — пока идёт, done — навсегда) и стартуют без него; при ошибке метка снимается
+    # Без Redis миграция откладывается до следующего старта, а не блокирует его
+    key = make_title_ngrams_backfill_key()
+    try:
+        if not await redis.set(key, "running", nx=True, ex=3600):
+            return
+    except RedisError:
+        return
+    try:
+        await MotorTasksRepository(db["tasks"]).backfill_title_ngrams()
+    except BaseException:
+        with contextlib.suppress(RedisError):
+            await redis.delete(key)
+        raise
+    await redis.set(key, "done")
+
+
+async def init_tasks_backend():
+    global _memory_tasks, _snapshot_writer
+
+    if settings.TASKS_BACKEND != "memory":
+        return
+    _memory_tasks = InMemoryTasksRepository()
+    if settings.TASKS_SNAPSHOT_PATH:
+        _memory_tasks.lock_snapshot(settings.TASKS_SNAPSHOT_PATH)
+        await _memory_tasks.load_snapshot(settings.TASKS_SNAPSHOT_PATH)
+        if settings.TASKS_SNAPSHOT_INTERVAL_SECONDS > 0:
+            _snapshot_writer = asyncio.create_task(_memory_tasks.persist_periodically(
+                settings.TASKS_SNAPSHOT_PATH, settings.TASKS_SNAPSHOT_INTERVAL_SECONDS
+            ))
 
 
 async def close_dependencies():
-    global _mongo_client, _redis_pool
+    global _mongo_client, _redis_pool, _redis_background_pool, _http_pool, _invalidation_listener, _snapshot_writer, \
+        _reminder_consumer
+
+    for task in (_invalidation_listener, _reminder_consumer):
+        if task:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    _reminder_consumer = None
+
+    if _snapshot_writer:
+        _snapshot_writer.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _snapshot_writer
+        _snapshot_writer = None
+    if _memory_tasks and settings.TASKS_SNAPSHOT_PATH:
+        await _memory_tasks.save_snapshot(settings.TASKS_SNAPSHOT_PATH)
+        _memory_tasks.unlock_snapshot()
 
     if _mongo_client:
         _mongo_client.close()
 
-    if _redis_pool:
-        await _redis_pool.aclose()
+    for pool in (_redis_pool, _redis_background_pool):
+        if pool:
+            await pool.aclose()
+
+    if _http_pool:
+        await _http_pool.aclose()
+
+    shutdown_password_executor()
 
 
 async def get_mongo_client() -> AsyncIOMotorClient:
@@ -72,26 +188,23 @@ async def get_redis_client() -> aioredis.Redis:
     return aioredis.Redis(connection_pool=_redis_pool)
 
 
-async def get_http_client() -> httpx.AsyncClient:
-    request_id = request_id_var.get("system")
+async def get_background_redis_client() -> aioredis.Redis:
+    if _redis_background_pool is None:
+        raise RuntimeError("Redis pool not initialized")
+    return aioredis.Redis(connection_pool=_redis_background_pool)
 
-    headers = {"Accept": "application/json"}
-    if request_id:
-        headers["X-Request-ID"] = request_id
 
-    return httpx.AsyncClient(
-        timeout=settings.HTTP_TIMEOUT,
-        limits=httpx.Limits(
-            max_connections=settings.HTTP_MAX_CONNECTIONS,
-            max_keepalive_connections=5
-        ),
-        headers=headers
-    )
+async def get_http_pool() -> HttpClientPool:
+    if _http_pool is None:
+        raise RuntimeError("HTTP client pool not initialized")
+    return _http_pool
 
 
 async def get_tasks_repo(
         db: Annotated[AsyncIOMotorDatabase, Depends(get_mongo_db)]
 ) -> TasksRepository:
+    if _memory_tasks is not None:
+        return _memory_tasks
     return MotorTasksRepository(db["tasks"])
 
 
@@ -104,34 +217,80 @@ async def get_users_repo(
 async def get_cache_service(
         redis: Annotated[aioredis.Redis, Depends(get_redis_client)]
 ) -> RedisCache:
-    return RedisCache(redis)
+    return RedisCache(redis, _local_cache)
+
+
+async def get_upstream_cache(
+        redis: Annotated[aioredis.Redis, Depends(get_redis_client)]
+) -> Optional[UpstreamCache]:
+    if not settings.UPSTREAM_CACHE_ENABLED:
+        return None
+    return UpstreamCache(redis)
+
+
+async def get_reminder_queue(
+        redis: Annotated[aioredis.Redis, Depends(get_redis_client)]
+) -> ReminderQueue:
+    return ReminderQueue(redis)
+
+
+async def get_import_jobs(
+        redis: Annotated[aioredis.Redis, Depends(get_redis_client)]
+) -> ImportJobQueue:
+    return ImportJobQueue(redis)
+
+
+async def get_user_cache(
+        redis: Annotated[aioredis.Redis, Depends(get_redis_client)]
+) -> UserCache:
+    return UserCache(redis, _local_user_cache)
 
 
 async def get_nager_importer(
-        http_client: Annotated[httpx.AsyncClient, Depends(get_http_client)]
+        http_pool: Annotated[HttpClientPool, Depends(get_http_pool)],
+        upstream_cache: Annotated[Optional[UpstreamCache], Depends(get_upstream_cache)]
 ) -> NagerImporter:
-    return NagerImporter(http_client)
+    return NagerImporter(http_pool.get(httpx.URL(NAGER_BASE_URL).host), upstream_cache)
 
 
 async def get_weather_importer(
-        http_client: Annotated[httpx.AsyncClient, Depends(get_http_client)]
+        http_pool: Annotated[HttpClientPool, Depends(get_http_pool)],
+        upstream_cache: Annotated[Optional[UpstreamCache], Depends(get_upstream_cache)]
 ) -> WeatherImporter:
-    return WeatherImporter(http_client)
+    return WeatherImporter(http_pool.get(httpx.URL(OPEN_METEO_BASE_URL).host), upstream_cache)
 
 
 async def get_news_importer(
-        http_client: Annotated[httpx.AsyncClient, Depends(get_http_client)]
+        http_pool: Annotated[HttpClientPool, Depends(get_http_pool)],
+        upstream_cache: Annotated[Optional[UpstreamCache], Depends(get_upstream_cache)]
 ) -> NewsImporter:
-    return NewsImporter(http_client)
+    return NewsImporter(http_pool.get(httpx.URL(SPACEFLIGHT_BASE_URL).host), upstream_cache)
 
 
 async def get_current_user(
     credentials: Annotated[Optional[HTTPAuthorizationCredentials], Depends(bearer_scheme)],
     users: Annotated[UsersRepository, Depends(get_users_repo)],
+    user_cache: Annotated[UserCache, Depends(get_user_cache)],
 ):
     if not credentials:
         raise HTTPException(status_code=401, detail='Not authenticated')
     token = credentials.credentials
-    payload = decode_token(token)
-    current_user = await users.get_by_id(payload.get('sub'))
+    payload = decode_token_cached(token)
+    user_id = payload.get('sub')
+    user_id_var.set(user_id)
+
+    current_user = await user_cache.get(user_id)
+    if current_user is None:
+        current_user = await users.get_by_id(user_id)
+        if current_user is None:
+            raise HTTPException(status_code=401, detail='Not authenticated')
+        current_user = await user_cache.set(current_user)
+    return current_user
+
+
+async def get_admin_user(
+    current_user: Annotated[dict, Depends(get_current_user)],
+):
+    if current_user["email"].lower() not in settings.ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail='Forbidden')
     return current_user
@@ -1,19 +1,39 @@
 import httpx
 from src.app.core.config import settings
+from src.app.core.logging import request_id_var
 
 
-def create_http_client(request_id: str = None) -> httpx.AsyncClient:
-    headers = {"Accept": "application/json"}
+async def _inject_request_id(request: httpx.Request):
+    request.headers["X-Request-ID"] = request_id_var.get()
 
-    if request_id:
-        headers["X-Request-ID"] = request_id
 
+def create_http_client() -> httpx.AsyncClient:
     return httpx.AsyncClient(
         timeout=settings.HTTP_TIMEOUT,
         limits=httpx.Limits(
             max_connections=settings.HTTP_MAX_CONNECTIONS,
-            max_keepalive_connections=5
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
         ),
-        headers=headers
+        http2=settings.HTTP2_ENABLED,
+        headers={"Accept": "application/json"},
+        event_hooks={"request": [_inject_request_id]}
     )
 
+
+class HttpClientPool:
+    # Один долгоживущий клиент на каждый upstream-хост: соединения переиспользуются между импортами
+    def __init__(self):
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def get(self, host: str) -> httpx.AsyncClient:
+        client = self._clients.get(host)
+        if client is None or client.is_closed:
+            client = create_http_client()
+            self._clients[host] = client
+        return client
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
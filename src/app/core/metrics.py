@@ -0,0 +1,135 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Iterable, Iterator
+
+# Метрики пишутся только из потока event loop (запросы, Motor-колбэки, задачи APScheduler),
+# поэтому горячий путь — обычные операции над dict/list без блокировок
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [счётчики по бакетам (+Inf последним), сумма, количество]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (bucket_counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), bucket_counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route"))
+http_requests_total = Counter(
+    "http_requests_total", "HTTP responses by route template and status", ("method", "route", "status"))
+mongo_operation_duration = Histogram(
+    "mongo_operation_duration_seconds", "Repository method latency", ("repository", "operation"))
+importer_fetch_duration = Histogram(
+    "importer_fetch_duration_seconds", "Upstream fetch latency by source and HTTP status", ("source", "status"))
+retention_tasks_total = Counter(
+    "retention_tasks_total", "Expired tasks processed by the retention engine", ("action",))
+upstream_retries_total = Counter(
+    "upstream_retries_total", "Retried upstream GET attempts", ("source",))
+upstream_hedged_requests_total = Counter(
+    "upstream_hedged_requests_total", "Hedged upstream requests sent and won", ("source", "outcome"))
+upstream_circuit_transitions_total = Counter(
+    "upstream_circuit_transitions_total", "Upstream circuit breaker transitions by target state", ("source", "state"))
+scheduler_job_duration = Histogram(
+    "scheduler_job_duration_seconds", "Background job runtime", ("job",),
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0))
+
+_metrics: list = [
+    http_request_duration,
+    http_requests_total,
+    mongo_operation_duration,
+    importer_fetch_duration,
+    scheduler_job_duration,
+    retention_tasks_total,
+    upstream_retries_total,
+    upstream_hedged_requests_total,
+    upstream_circuit_transitions_total,
+]
+# Источники, которые сами ведут счётчики и отдают строки только при рендере
+_collectors: list[Callable[[], Iterable[str]]] = []
+
+
+def register_collector(collector: Callable[[], Iterable[str]]):
+    _collectors.append(collector)
+
+
+def timed_repository(repository: str):
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with mongo_operation_duration.time(repository, func.__name__):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_metrics() -> str:
+    lines: list[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
@@ -1,5 +1,10 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Any, Optional
 
@@ -10,6 +15,9 @@ from passlib.context import CryptContext
 from src.app.core.config import settings
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Проверенные claims по sha256 токена; запись живёт до exp токена
+_token_cache: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -19,6 +27,42 @@ def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
 
+# bcrypt отпускает GIL, поэтому пул потоков снимает хэширование с event loop.
+# Очередь ограничена: при переполнении запрос сразу получает 503, а не ждёт за всеми остальными
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_in_flight = 0
+
+
+async def _run_password_job(func, *args):
+    global _hash_executor, _hash_in_flight
+    if _hash_in_flight >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE:
+        raise HTTPException(status_code=503, detail='Too many authentication requests',
+                            headers={"Retry-After": "1"})
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS,
+                                            thread_name_prefix="password-hash")
+    _hash_in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_in_flight -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_password_job(hash_password, password)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    return await _run_password_job(verify_password, password, password_hash)
+
+
+def shutdown_password_executor():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+
 def create_access_token(sub: str) -> str:
     now = datetime.now(tz=timezone.utc)
     exp = now + settings.access_token_timedelta
@@ -35,4 +79,21 @@ def decode_token(token: str) -> Optional[dict[str, Any]]:
         })
         return payload
     except JWTError:
-        raise HTTPException(status_code=401, detail='Invalid or expired token')
\ No newline at end of file
+        raise HTTPException(status_code=401, detail='Invalid or expired token')
+
+
+def decode_token_cached(token: str) -> dict[str, Any]:
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    payload = _token_cache.get(token_hash)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            _token_cache.move_to_end(token_hash)
+            return payload
+        del _token_cache[token_hash]
+        raise HTTPException(status_code=401, detail='Invalid or expired token')
+
+    payload = decode_token(token)
+    _token_cache[token_hash] = payload
+    if len(_token_cache) > settings.AUTH_TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+    return payload
@@ -0,0 +1,138 @@
+import heapq
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from pymongo import monitoring
+
+from src.app.core.config import settings
+from src.app.core.logging import request_id_var, user_id_var
+from src.app.core.metrics import Histogram, register_collector
+
+
+logger = logging.getLogger("mongo")
+
+# Служебные команды драйвера: в профиль не попадают
+IGNORED_COMMANDS = {
+    "hello", "ismaster", "isMaster", "ping", "buildInfo", "getnonce", "saslStart", "saslContinue",
+    "authenticate", "endSessions", "killCursors",
+}
+# Поля команды, из которых строится форма запроса; документы вставки и служебные поля драйвера пропускаются
+SHAPE_FIELDS = ("filter", "query", "sort", "projection", "hint", "pipeline", "updates", "deletes", "key")
+
+
+def query_shape(value: Any) -> Any:
+    # Значения заменяются на "?", списки сворачиваются до формы первого элемента ($in, bulk-обновления)
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [query_shape(value[0])] if value else []
+    return "?"
+
+
+def command_shape(command: dict[str, Any]) -> str:
+    shape = {field: query_shape(command[field]) for field in SHAPE_FIELDS if field in command}
+    return json.dumps(shape, ensure_ascii=False, default=str)
+
+
+class CommandProfiler(monitoring.CommandListener):
+    # Motor вызывает слушателей в потоках своего executor'а с копией контекста запроса,
+    # поэтому request_id/user_id доступны здесь, а общее состояние защищено блокировкой
+
+    def __init__(self, slow_ms: float, top_n: int, window_seconds: int, max_shapes: int):
+        self.slow_ms = slow_ms
+        self.top_n = top_n
+        self.window_seconds = window_seconds
+        self.max_shapes = max_shapes
+        self.duration = Histogram(
+            "mongo_command_duration_seconds", "MongoDB command latency", ("command", "collection"))
+        self._lock = threading.Lock()
+        self._pending: dict[tuple, tuple[str, str, str, str, str]] = {}
+        # (command, collection, shape) -> агрегат; порядок — по последнему появлению
+        self._shapes: OrderedDict[tuple[str, str, str], dict[str, Any]] = OrderedDict()
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        context = (event.command_name, collection, command_shape(event.command), request_id_var.get(), user_id_var.get())
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = context
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finish(event)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._finish(event)
+
+    def _finish(self, event):
+        duration_ms = event.duration_micros / 1000
+        with self._lock:
+            context = self._pending.pop((event.connection_id, event.request_id), None)
+            if context is None:
+                return
+            command, collection, shape, request_id, user_id = context
+            self.duration.observe(duration_ms / 1000, command, collection)
+            self._record(command, collection, shape, duration_ms, request_id, user_id)
+
+        if duration_ms >= self.slow_ms:
+            logger.warning(
+                f"Slow MongoDB {command} on {collection or '-'}: {duration_ms:.1f} ms, shape={shape}",
+                extra={"http_duration_ms": round(duration_ms, 1)}
+            )
+
+    def _record(self, command: str, collection: str, shape: str, duration_ms: float, request_id: str, user_id: str):
+        key = (command, collection, shape)
+        stats = self._shapes.pop(key, None)
+        if stats is None:
+            stats = {"command": command, "collection": collection, "shape": shape,
+                     "count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            if len(self._shapes) >= self.max_shapes:
+                self._shapes.popitem(last=False)
+        stats["count"] += 1
+        stats["total_ms"] += duration_ms
+        if duration_ms >= stats["max_ms"]:
+            stats["max_ms"] = duration_ms
+            stats["slowest_request_id"] = request_id
+            stats["slowest_user_id"] = user_id
+        stats["last_seen"] = time.time()
+        self._shapes[key] = stats
+
+    def top(self, limit: int | None = None) -> list[dict[str, Any]]:
+        # Окно скользящее: формы, не появлявшиеся дольше window_seconds, выбывают из рейтинга
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            while self._shapes:
+                key, stats = next(iter(self._shapes.items()))
+                if stats["last_seen"] >= cutoff:
+                    break
+                del self._shapes[key]
+            slowest = heapq.nlargest(limit or self.top_n, self._shapes.values(), key=lambda s: s["max_ms"])
+            slowest = [dict(stats) for stats in slowest]
+        for stats in slowest:
+            stats["avg_ms"] = round(stats["total_ms"] / stats["count"], 3)
+            stats["total_ms"] = round(stats["total_ms"], 3)
+            stats["max_ms"] = round(stats["max_ms"], 3)
+        return slowest
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+
+    def render(self):
+        with self._lock:
+            return list(self.duration.render())
+
+
+command_profiler = CommandProfiler(
+    settings.MONGO_SLOW_QUERY_MS,
+    settings.MONGO_PROFILE_TOP_N,
+    settings.MONGO_PROFILE_WINDOW_SECONDS,
+    settings.MONGO_PROFILE_MAX_SHAPES,
+)
+register_collector(command_profiler.render)
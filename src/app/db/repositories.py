@@ -1,25 +1,76 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
+import json
+import logging
+import os
 import re
 import uuid
+from bisect import bisect_left, bisect_right, insort
 from datetime import date
+from pathlib import Path
 
 from fastapi import HTTPException
-from typing import Any, Optional, Protocol
+from typing import Any, AsyncIterator, Optional, Protocol
 from src.app.core.security import hash_password, create_access_token, verify_password
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from src.app.models.users import TokenResponse
+from src.app.core.metrics import timed_repository
+from src.app.db.search import matches, query_ngrams, relevance, title_ngrams
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # Pydantic-like plain dicts for repositories
 UserDict = dict[str, Any]
 TaskDict = dict[str, Any]
 
+logger = logging.getLogger("db")
+
 ALLOWED_TYPES = {"task", "meeting", "deadline", "holiday", "news"}
 ALLOWED_STATUS = {"todo", "done"}
 
 
+def _archive_doc(task: TaskDict, archived_at: datetime.datetime) -> dict[str, Any]:
+    # Компактная запись архива: без n-грамм и meta, из meta остаётся только source_id
+    user_id = task["user_id"]
+    doc = {
+        "_id": ObjectId(task["id"]),
+        "user_id": ObjectId(user_id) if ObjectId.is_valid(user_id) else user_id,
+        "title": task["title"],
+        "date": task["date"],
+        "type": task["type"],
+        "status": task["status"],
+        "source": task["source"],
+        "archived_at": archived_at,
+    }
+    source_id = (task.get("meta") or {}).get("source_id")
+    if source_id:
+        doc["source_id"] = source_id
+    return doc
+
+
+async def archive_tasks(archive: AsyncIOMotorCollection, tasks: list[TaskDict]) -> int:
+    if not tasks:
+        return 0
+    archived_at = datetime.datetime.now(datetime.timezone.utc)
+    try:
+        res = await archive.insert_many([_archive_doc(t, archived_at) for t in tasks], ordered=False)
+        return len(res.inserted_ids)
+    except BulkWriteError as e:
+        # Прошлый прогон успел заархивировать часть пачки, но не удалить её: дубликаты _id пропускаем
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+        return e.details.get("nInserted", 0)
+
+
 # Protocols
 class UsersRepository(Protocol):
     async def create(self, email: str, password_hash: str) -> UserDict: ...
@@ -31,8 +82,14 @@ class TasksRepository(Protocol):
     async def create(self, user_id: str, data: TaskDict) -> TaskDict: ...
     async def get(self, task_id: str) -> Optional[TaskDict]: ...
     async def list(
-        self, user_id: str, *, date_eq: Optional[date] = None, type_eq: Optional[str] = None, q: Optional[str] = None
+        self, user_id: str, *, date_eq: Optional[date] = None, type_eq: Optional[str] = None, q: Optional[str] = None,
+        limit: Optional[int] = None, after: Optional[tuple[str, str]] = None
     ) -> list[TaskDict]: ...
+    def iter(
+        self, user_id: str, *, date_eq: Optional[date] = None, type_eq: Optional[str] = None, q: Optional[str] = None,
+        after: Optional[tuple[str, str]] = None
+    ) -> AsyncIterator[TaskDict]: ...
+    async def search(self, user_id: str, q: str, *, limit: int = 20) -> list[TaskDict]: ...
     async def update(self, task_id: str, patch: dict[str, Any]) -> Optional[TaskDict]: ...
     async def delete(self, task_id: str) -> bool: ...
     async def insert_many_generic(self, user_id: str, items: list[TaskDict]) -> tuple[int, list[TaskDict]]: ...
@@ -53,6 +110,7 @@ class MotorUsersRepository(UsersRepository):
         }
 
 
+    @timed_repository("users")
     async def create(self, email: str, password_hash: str) -> UserDict:
         doc = {"email": email, "password_hash": password_hash}
         res = await self.coll.insert_one(doc)
@@ -61,21 +119,35 @@ class MotorUsersRepository(UsersRepository):
         return self._to_public(created)
 
 
+    @timed_repository("users")
     async def get_by_email(self, email: str) -> Optional[UserDict]:
         doc = await self.coll.find_one({"email": email})
         return self._to_public(doc) if doc else None
 
 
+    @timed_repository("users")
     async def get_by_id(self, user_id: str) -> Optional[UserDict]:
         doc = await self.coll.find_one({"_id": ObjectId(user_id)})
         return self._to_public(doc) if doc else None
 
 
+    @timed_repository("users")
     async def list_all(self):
         docs = await self.coll.find({}).to_list(length=None)
         return [self._to_public(doc) for doc in docs]
 
 
+    async def iter_id_batches(self, batch_size: int) -> AsyncIterator[list[str]]:
+        batch: list[str] = []
+        async for doc in self.coll.find({}, {"_id": 1}).batch_size(batch_size):
+            batch.append(str(doc["_id"]))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
 
 class MotorTasksRepository(TasksRepository):
     def __init__(self, coll: AsyncIOMotorCollection) -> None:
@@ -95,6 +167,7 @@ class MotorTasksRepository(TasksRepository):
         }
 
 
+    @timed_repository("tasks")
     async def create(self, user_id: str, data: TaskDict) -> TaskDict:
         doc = {
             "user_id": ObjectId(user_id),
@@ -104,6 +177,7 @@ class MotorTasksRepository(TasksRepository):
             "status": data.get("status", "todo"),
             "source": data.get("source", "local"),
             "meta": data.get("meta", {}),
+            "title_ngrams": title_ngrams(data["title"]),
         }
         res = await self.coll.insert_one(doc)
         inserted = await self.coll.find_one({"_id": res.inserted_id})
@@ -111,27 +185,72 @@ class MotorTasksRepository(TasksRepository):
         return self._to_public(inserted)
 
 
+    @timed_repository("tasks")
     async def get(self, task_id: str) -> Optional[TaskDict]:
         doc = await self.coll.find_one({"_id": ObjectId(task_id)})
         return self._to_public(doc) if doc else None
 
 
-    async def list(
-        self, user_id: str, *, date_eq: Optional[date] = None, type_eq: Optional[str] = None, q: Optional[str] = None
-    ) -> list[TaskDict]:
+    @staticmethod
+    def _list_query(
+        user_id: str, date_eq: Optional[date], type_eq: Optional[str], q: Optional[str],
+        after: Optional[tuple[str, str]] = None
+    ) -> dict[str, Any]:
         query: dict[str, Any] = {"user_id": ObjectId(user_id)}
         if date_eq:
             query["date"] = date_eq.isoformat()
         if type_eq:
             query["type"] = type_eq
         if q:
+            # Индекс (user_id, title_ngrams) сужает выборку до кандидатов, regex лишь подтверждает подстроку
+            ngrams = query_ngrams(q)
+            if ngrams:
+                query["title_ngrams"] = {"$all": ngrams}
             query["title"] = {"$regex": re.escape(q), "$options": "i"}
-        cursor = self.coll.find(query).sort("date", 1)
+        if after:
+            # Keyset-пагинация по (date, _id): продолжаем строго после последней отданной задачи
+            after_date, after_id = after
+            query["$or"] = [
+                {"date": {"$gt": after_date}},
+                {"date": after_date, "_id": {"$gt": ObjectId(after_id)}},
+            ]
+        return query
+
+
+    @timed_repository("tasks")
+    async def list(
+        self, user_id: str, *, date_eq: Optional[date] = None, type_eq: Optional[str] = None, q: Optional[str] = None,
+        limit: Optional[int] = None, after: Optional[tuple[str, str]] = None
+    ) -> list[TaskDict]:
+        query = self._list_query(user_id, date_eq, type_eq, q, after)
+        cursor = self.coll.find(query).sort([("date", 1), ("_id", 1)])
+        if limit:
+            cursor = cursor.limit(limit)
         docs = [self._to_public(d) async for d in cursor]
         return docs
 
 
+    async def iter(
+        self, user_id: str, *, date_eq: Optional[date] = None, type_eq: Optional[str] = None, q: Optional[str] = None,
+        after: Optional[tuple[str, str]] = None
+    ) -> AsyncIterator[TaskDict]:
+        query = self._list_query(user_id, date_eq, type_eq, q, after)
+        async for doc in self.coll.find(query).sort([("date", 1), ("_id", 1)]):
+            yield self._to_public(doc)
+
+
+    @timed_repository("tasks")
+    async def search(self, user_id: str, q: str, *, limit: int = 20) -> list[TaskDict]:
+        query = self._list_query(user_id, None, None, q)
+        docs = [self._to_public(d) async for d in self.coll.find(query)]
+        docs.sort(key=lambda d: (relevance(d["title"], q), d["date"]))
+        return docs[:limit]
+
+
+    @timed_repository("tasks")
     async def update(self, task_id: str, patch: dict[str, Any]) -> Optional[TaskDict]:
+        if "title" in patch:
+            patch = {**patch, "title_ngrams": title_ngrams(patch["title"])}
         res = await self.coll.find_one_and_update(
             {"_id": ObjectId(task_id)},
             {"$set": patch},
@@ -140,34 +259,61 @@ class MotorTasksRepository(TasksRepository):
         return self._to_public(res) if res else None
 
 
+    @timed_repository("tasks")
     async def delete(self, task_id: str) -> bool:
         res = await self.coll.delete_one({"_id": ObjectId(task_id)})
         return res.deleted_count == 1
 
 
+    @timed_repository("tasks")
     async def insert_many_generic(self, user_id: str, items: list[TaskDict]) -> tuple[int, list[TaskDict]]:
-        skipped = 0
         if not items:
             return 0, []
         for it in items:
             it["user_id"] = ObjectId(user_id)
+            it["title_ngrams"] = title_ngrams(it["title"])
         # Используем upsert по уникальному индексу meta.source_id+user_id (создан при старте)
-        inserted: list[TaskDict] = []
-        for it in items:
-            res = await self.coll.update_one(
+        # Все upsert'ы уходят одним unordered bulk_write, вставленные документы собираются локально
+        operations = [
+            UpdateOne(
                 {"user_id": it["user_id"], "meta.source_id": it["meta"]["source_id"]},
                 {"$setOnInsert": it},
                 upsert=True,
             )
-            if res.upserted_id:
-                doc = await self.coll.find_one({"_id": res.upserted_id})
-                if doc:
-                    inserted.append(self._to_public(doc))
-            else:
-                skipped+=1
+            for it in items
+        ]
+        try:
+            res = await self.coll.bulk_write(operations, ordered=False)
+            upserted_ids = res.upserted_ids or {}
+        except BulkWriteError as e:
+            # Параллельный импорт успел вставить тот же source_id: такие элементы считаются пропущенными
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+            upserted_ids = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+
+        inserted: list[TaskDict] = []
+        for index in sorted(upserted_ids):
+            doc = {**items[index], "_id": upserted_ids[index]}
+            inserted.append(self._to_public(doc))
         return len(inserted), inserted
 
 
+    @timed_repository("tasks")
+    async def backfill_title_ngrams(self, batch_size: int = 500) -> int:
+        # Догоняем поисковый индекс для задач, созданных до появления title_ngrams
+        updated = 0
+        operations = []
+        async for doc in self.coll.find({"title_ngrams": {"$exists": False}}, {"title": 1}):
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"title_ngrams": title_ngrams(doc["title"])}}))
+            if len(operations) >= batch_size:
+                updated += (await self.coll.bulk_write(operations, ordered=False)).modified_count
+                operations = []
+        if operations:
+            updated += (await self.coll.bulk_write(operations, ordered=False)).modified_count
+        return updated
+
+
+    @timed_repository("tasks")
     async def delete_many(self, date_lt: datetime.datetime, status: Optional[str] = None) -> int:
         filter_params = {"date": {"$lt": date_lt.strftime("%Y-%m-%d")}}
         if status:
@@ -176,12 +322,47 @@ class MotorTasksRepository(TasksRepository):
         return res.deleted_count
 
 
+    @timed_repository("tasks")
+    async def expire_batch(
+        self, date_lt: str, batch_size: int, archive: Optional[AsyncIOMotorCollection] = None
+    ) -> tuple[int, int, set[str]]:
+        # Одна ограниченная пачка по индексу (date): сначала архив, затем удаление по _id.
+        # Повторная проверка даты при удалении не даёт стереть задачу, перенесённую в будущее за это время.
+        # Третий элемент — владельцы задач пачки, чьи кэши нужно сбросить
+        query = {"date": {"$lt": date_lt}}
+        projection = {"title_ngrams": 0} if archive is not None else {"_id": 1, "user_id": 1}
+        docs = await self.coll.find(query, projection).limit(batch_size).to_list(length=batch_size)
+        if not docs:
+            return 0, 0, set()
+        archived = await archive_tasks(archive, [self._to_public(d) for d in docs]) if archive is not None else 0
+        res = await self.coll.delete_many({"_id": {"$in": [d["_id"] for d in docs]}, "date": {"$lt": date_lt}})
+        return archived, res.deleted_count, {str(d["user_id"]) for d in docs}
+
+
+    @timed_repository("tasks")
     async def find_upcoming(self, date_from: datetime.datetime, date_to: datetime.datetime):
         filter_params = {"date": {"$gte": date_from.strftime("%Y-%m-%d"), "$lte": date_to.strftime("%Y-%m-%d")}}
         docs = await self.coll.find(filter_params).to_list(length=None)
         return [self._to_public(doc) for doc in docs]
 
 
+    async def iter_upcoming_batches(
+        self, date_from: datetime.datetime, batch_size: int
+    ) -> AsyncIterator[list[TaskDict]]:
+        # Keyset по _id: каждая пачка — отдельный ограниченный запрос, в памяти не больше batch_size задач.
+        # Отдаются только поля, нужные для постановки напоминания
+        query: dict[str, Any] = {"date": {"$gte": date_from.strftime("%Y-%m-%d")}}
+        while True:
+            cursor = self.coll.find(query, {"date": 1, "status": 1}).sort("_id", 1).limit(batch_size)
+            docs = await cursor.to_list(length=batch_size)
+            if not docs:
+                return
+            yield [{"id": str(doc["_id"]), "date": doc["date"], "status": doc["status"]} for doc in docs]
+            if len(docs) < batch_size:
+                return
+            query["_id"] = {"$gt": docs[-1]["_id"]}
+
+
 # In-memory repositories
 class InMemoryUsersRepository(UsersRepository):
     def __init__(self) -> None:
@@ -220,74 +401,295 @@ class InMemoryUsersRepository(UsersRepository):
             return TokenResponse(access_token=token)
 
 
+class _UserTasksIndex:
+    # Индексы задач одного пользователя; ключ сортировки (date, id) совпадает с порядком Motor-репозитория
+    __slots__ = ("order", "by_type", "by_source_id", "ngrams")
+
+    def __init__(self) -> None:
+        self.order: list[tuple[str, str]] = []
+        self.by_type: dict[str, list[tuple[str, str]]] = {}
+        self.by_source_id: dict[str, str] = {}
+        self.ngrams: dict[str, set[str]] = {}  # триграмма -> id задач
+
+
+def _iso_date(value: Any) -> str:
+    return value.isoformat() if isinstance(value, date) else str(value)
+
+
+def _sorted_remove(keys: list[tuple[str, str]], key: tuple[str, str]) -> None:
+    i = bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        del keys[i]
+
+
 class InMemoryTasksRepository(TasksRepository):
+    # Однонодовый backend (TASKS_BACKEND=memory): стоимость list — O(log n + результат) за счёт
+    # отсортированных по (date, id) индексов на пользователя; id совместимы с ObjectId, как у Motor
+    SNAPSHOT_VERSION = 1
+
     def __init__(self) -> None:
         self._items: dict[str, TaskDict] = {}  # id -> task
+        self._users: dict[str, _UserTasksIndex] = {}
+        self._snapshot_lock = None
+
+    def _add(self, doc: TaskDict) -> None:
+        self._items[doc["id"]] = doc
+        index = self._users.get(doc["user_id"])
+        if index is None:
+            index = self._users[doc["user_id"]] = _UserTasksIndex()
+        key = (doc["date"], doc["id"])
+        insort(index.order, key)
+        insort(index.by_type.setdefault(doc["type"], []), key)
+        source_id = doc["meta"].get("source_id")
+        if source_id:
+            index.by_source_id[source_id] = doc["id"]
+        for ngram in title_ngrams(doc["title"]):
+            index.ngrams.setdefault(ngram, set()).add(doc["id"])
+
+    def _remove(self, doc: TaskDict) -> None:
+        del self._items[doc["id"]]
+        index = self._users[doc["user_id"]]
+        key = (doc["date"], doc["id"])
+        _sorted_remove(index.order, key)
+        _sorted_remove(index.by_type.get(doc["type"], []), key)
+        source_id = doc["meta"].get("source_id")
+        if source_id and index.by_source_id.get(source_id) == doc["id"]:
+            del index.by_source_id[source_id]
+        for ngram in title_ngrams(doc["title"]):
+            ids = index.ngrams.get(ngram)
+            if ids:
+                ids.discard(doc["id"])
+                if not ids:
+                    del index.ngrams[ngram]
+
+    def _search_candidates(self, user_id: str, q: str) -> list[TaskDict]:
+        index = self._users.get(user_id)
+        if index is None:
+            return []
+        ngrams = query_ngrams(q)
+        if not ngrams:
+            docs = (self._items[tid] for _, tid in index.order)
+            return [d for d in docs if matches(d["title"], q)]
+        postings = sorted((index.ngrams.get(ngram, set()) for ngram in ngrams), key=len)
+        ids = set.intersection(*postings)
+        return [self._items[tid] for tid in ids if matches(self._items[tid]["title"], q)]
+
+    def _select(
+        self, user_id: str, date_eq: Optional[date], type_eq: Optional[str], q: Optional[str],
+        limit: Optional[int], after: Optional[tuple[str, str]]
+    ) -> list[TaskDict]:
+        day = date_eq.isoformat() if date_eq else None
+        if q:
+            # Кандидаты из триграммного индекса уже малы: фильтруем и сортируем только их
+            items = self._search_candidates(user_id, q)
+            items = [
+                d for d in items
+                if (day is None or d["date"] == day) and (type_eq is None or d["type"] == type_eq)
+                and (after is None or (d["date"], d["id"]) > after)
+            ]
+            items.sort(key=lambda d: (d["date"], d["id"]))
+            return [dict(d) for d in (items[:limit] if limit else items)]
+
+        index = self._users.get(user_id)
+        if index is None:
+            return []
+        keys = index.by_type.get(type_eq, []) if type_eq else index.order
+        lo, hi = 0, len(keys)
+        if day:
+            lo, hi = bisect_left(keys, (day,)), bisect_right(keys, (day, "\uffff"))
+        if after:
+            lo = max(lo, bisect_right(keys, after))
+        if limit:
+            hi = min(hi, lo + limit)
+        return [dict(self._items[tid]) for _, tid in keys[lo:hi]]
 
     async def create(self, user_id: str, data: TaskDict) -> TaskDict:
-        tid = uuid.uuid4().hex
         doc = {
-            "id": tid,
+            "id": str(ObjectId()),
             "user_id": user_id,
             "title": data["title"],
-            "date": data["date"],
+            "date": _iso_date(data["date"]),
             "type": data.get("type", "task"),
             "status": data.get("status", "todo"),
             "source": data.get("source", "local"),
             "meta": data.get("meta", {}),
         }
-        self._items[tid] = doc
-        return doc
+        self._add(doc)
+        return dict(doc)
 
 
-    async def get(self, user_id: str, task_id: str) -> Optional[TaskDict]:
+    async def get(self, task_id: str) -> Optional[TaskDict]:
         doc = self._items.get(task_id)
-        if not doc or doc["user_id"] != user_id:
-            return None
-        return doc
+        return dict(doc) if doc else None
 
 
     async def list(
-        self, user_id: str, *, date_eq: Optional[date] = None, type_eq: Optional[str] = None, q: Optional[str] = None
+        self, user_id: str, *, date_eq: Optional[date] = None, type_eq: Optional[str] = None, q: Optional[str] = None,
+        limit: Optional[int] = None, after: Optional[tuple[str, str]] = None
     ) -> list[TaskDict]:
-        items = [d for d in self._items.values() if d["user_id"] == user_id]
-        if date_eq:
-            items = [d for d in items if d["date"] == date_eq.isoformat()]
-        if type_eq:
-            items = [d for d in items if d["type"] == type_eq]
-        if q:
-            items = [d for d in items if q.lower() in d["title"].lower()]
-        return sorted(items, key=lambda x: x["date"])
+        return self._select(user_id, date_eq, type_eq, q, limit, after)
 
 
-    async def update(self, user_id: str, task_id: str, patch: dict[str, Any]) -> Optional[TaskDict]:
-        doc = await self.get(user_id, task_id)
+    async def iter(
+        self, user_id: str, *, date_eq: Optional[date] = None, type_eq: Optional[str] = None, q: Optional[str] = None,
+        after: Optional[tuple[str, str]] = None
+    ) -> AsyncIterator[TaskDict]:
+        for doc in self._select(user_id, date_eq, type_eq, q, None, after):
+            yield doc
+
+
+    async def search(self, user_id: str, q: str, *, limit: int = 20) -> list[TaskDict]:
+        items = self._search_candidates(user_id, q)
+        items.sort(key=lambda d: (relevance(d["title"], q), d["date"]))
+        return [dict(d) for d in items[:limit]]
+
+
+    async def update(self, task_id: str, patch: dict[str, Any]) -> Optional[TaskDict]:
+        doc = self._items.get(task_id)
         if not doc:
             return None
-        doc.update(patch)
-        return doc
+        if "date" in patch:
+            patch = {**patch, "date": _iso_date(patch["date"])}
+        self._remove(doc)
+        doc = {**doc, **patch}
+        self._add(doc)
+        return dict(doc)
 
 
-    async def delete(self, user_id: str, task_id: str) -> bool:
-        doc = await self.get(user_id, task_id)
+    async def delete(self, task_id: str) -> bool:
+        doc = self._items.get(task_id)
         if not doc:
             return False
-        del self._items[task_id]
+        self._remove(doc)
         return True
 
 
     async def insert_many_generic(self, user_id: str, items: list[TaskDict]) -> tuple[int, list[TaskDict]]:
-        existing_source_ids = {
-            d["meta"].get("source_id")
-            for d in self._items.values()
-            if d["user_id"] == user_id and d.get("meta")
-        }
+        index = self._users.get(user_id)
         inserted: list[TaskDict] = []
         for it in items:
-            sid = it["meta"]["source_id"]
-            if sid in existing_source_ids:
+            if index is not None and it["meta"]["source_id"] in index.by_source_id:
                 continue
-            created = await self.create(user_id, it)
-            inserted.append(created)
-            existing_source_ids.add(sid)
+            inserted.append(await self.create(user_id, it))
+            index = self._users[user_id]
         return len(inserted), inserted
+
+
+    async def delete_many(self, date_lt: datetime.datetime, status: Optional[str] = None) -> int:
+        cutoff = date_lt.strftime("%Y-%m-%d")
+        deleted = 0
+        for index in list(self._users.values()):
+            expired = index.order[:bisect_left(index.order, (cutoff,))]
+            for _, tid in expired:
+                doc = self._items[tid]
+                if status is None or doc["status"] == status:
+                    self._remove(doc)
+                    deleted += 1
+        return deleted
+
+
+    async def expire_batch(
+        self, date_lt: str, batch_size: int, archive: Optional[AsyncIOMotorCollection] = None
+    ) -> tuple[int, int, set[str]]:
+        expired: list[TaskDict] = []
+        for index in self._users.values():
+            for _, tid in index.order[:bisect_left(index.order, (date_lt,))]:
+                expired.append(self._items[tid])
+                if len(expired) >= batch_size:
+                    break
+            if len(expired) >= batch_size:
+                break
+        archived = await archive_tasks(archive, expired) if archive is not None else 0
+        for doc in expired:
+            self._remove(doc)
+        return archived, len(expired), {doc["user_id"] for doc in expired}
+
+
+    async def find_upcoming(self, date_from: datetime.datetime, date_to: datetime.datetime):
+        start, end = date_from.strftime("%Y-%m-%d"), date_to.strftime("%Y-%m-%d")
+        upcoming = []
+        for index in self._users.values():
+            lo, hi = bisect_left(index.order, (start,)), bisect_right(index.order, (end, "\uffff"))
+            upcoming.extend(dict(self._items[tid]) for _, tid in index.order[lo:hi])
+        return upcoming
+
+
+    async def iter_upcoming_batches(
+        self, date_from: datetime.datetime, batch_size: int
+    ) -> AsyncIterator[list[TaskDict]]:
+        start = date_from.strftime("%Y-%m-%d")
+        task_ids = sorted(tid for tid, doc in self._items.items() if doc["date"] >= start)
+        for i in range(0, len(task_ids), batch_size):
+            # Между пачками задачи могли удалить
+            batch = [dict(self._items[tid]) for tid in task_ids[i:i + batch_size] if tid in self._items]
+            if batch:
+                yield batch
+
+
+    async def save_snapshot(self, path: str) -> int:
+        # Копия снимается в event loop, сериализация и запись — в потоке; os.replace делает замену атомарной
+        docs = [dict(doc) for doc in self._items.values()]
+
+        def write():
+            target = Path(path)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": self.SNAPSHOT_VERSION, "tasks": docs}, f, ensure_ascii=False)
+            os.replace(tmp, target)
+
+        await asyncio.to_thread(write)
+        return len(docs)
+
+
+    def lock_snapshot(self, path: str) -> None:
+        # У каждого процесса своё хранилище в памяти: второй воркер с тем же снимком затёр бы чужие данные,
+        # поэтому файл снимка монопольно закрепляется за одним процессом (блокировка снимается ОС при выходе)
+        lock_path = Path(path).with_name(Path(path).name + ".lock")
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(lock_path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(
+                f"Tasks snapshot {path} is used by another process: TASKS_BACKEND=memory needs a single worker "
+                f"(or a separate TASKS_SNAPSHOT_PATH per process)"
+            )
+        self._snapshot_lock = lock_file
+
+
+    def unlock_snapshot(self) -> None:
+        if self._snapshot_lock is not None:
+            self._snapshot_lock.close()
+            self._snapshot_lock = None
+
+
+    async def load_snapshot(self, path: str) -> int:
+        if not os.path.exists(path):
+            return 0
+
+        def read():
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+
+        snapshot = await asyncio.to_thread(read)
+        if snapshot.get("version") != self.SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported tasks snapshot version: {snapshot.get('version')}")
+        self._items.clear()
+        self._users.clear()
+        for doc in snapshot["tasks"]:
+            self._add(doc)
+        return len(self._items)
+
+
+    async def persist_periodically(self, path: str, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.save_snapshot(path)
+            except Exception as e:
+                logger.error(f"Tasks snapshot failed: {e}", exc_info=True)
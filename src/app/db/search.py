@@ -0,0 +1,42 @@
+import re
+
+NGRAM_SIZE = 3
+_whitespace = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _whitespace.sub(" ", text.casefold()).strip()
+
+
+def title_ngrams(title: str) -> list[str]:
+    # Триграммы нормализованного заголовка; пробелы оставляем, чтобы искались и фразы вроде "взять зонт"
+    text = normalize_text(title)
+    if len(text) < NGRAM_SIZE:
+        return [text] if text else []
+    return sorted({text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)})
+
+
+def query_ngrams(q: str) -> list[str]:
+    # Для запросов короче триграммы индекс не помогает: вызывающий код падает обратно на regex
+    text = normalize_text(q)
+    if len(text) < NGRAM_SIZE:
+        return []
+    return title_ngrams(text)
+
+
+def matches(title: str, q: str) -> bool:
+    return normalize_text(q) in normalize_text(title)
+
+
+def relevance(title: str, q: str) -> tuple[int, int]:
+    text = normalize_text(title)
+    needle = normalize_text(q)
+    if text == needle:
+        rank = 0
+    elif text.startswith(needle):
+        rank = 1
+    elif any(word.startswith(needle) for word in text.split(" ")):
+        rank = 2
+    else:
+        rank = 3
+    return rank, len(text)
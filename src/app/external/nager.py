@@ -1,7 +1,8 @@
 from __future__ import annotations
 import re
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 import httpx
+from src.app.cache.upstream import UpstreamCache, fetch_json
 from src.app.external.base import ExternalImporter
 
 
@@ -12,14 +13,13 @@ _slug_multi_underscore = re.compile(r"_+")
 
 class NagerImporter(ExternalImporter):
 
-    def __init__(self, http_client: httpx.AsyncClient):
+    def __init__(self, http_client: httpx.AsyncClient, upstream_cache: Optional[UpstreamCache] = None):
         self.client = http_client
+        self.upstream_cache = upstream_cache
 
     async def fetch_raw(self, year: int, country: str, request_id: str = None) -> List[Dict[str, Any]]:
-        url = f'{NAGER_BASE_URL}/{year}/{country}'
-        response = await self.client.get(url)
-        response.raise_for_status()
-        return response.json()
+        url = f'{NAGER_BASE_URL}/{year}/{country.upper()}'
+        return await fetch_json(self.client, "nager", url, upstream_cache=self.upstream_cache)
 
 
     def slugify(self, text: str, *, max_len: int = 40) -> str:
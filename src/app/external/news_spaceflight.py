@@ -4,16 +4,17 @@ import hashlib
 
 import httpx
 
+from src.app.cache.upstream import UpstreamCache, fetch_json
 from src.app.external.base import ExternalImporter
-from src.app.core.http import create_http_client
 
 SPACEFLIGHT_BASE_URL = "https://api.spaceflightnewsapi.net/v4/articles/"
 
 
 class NewsImporter(ExternalImporter):
 
-    def __init__(self, http_client: httpx.AsyncClient):
+    def __init__(self, http_client: httpx.AsyncClient, upstream_cache: Optional[UpstreamCache] = None):
         self.client = http_client
+        self.upstream_cache = upstream_cache
 
     async def fetch_raw(
             self,
@@ -23,14 +24,12 @@ class NewsImporter(ExternalImporter):
             request_id: str = None
     ) -> dict:
         params = {
-            "search": q,
+            "search": q.strip().lower(),
             "limit": limit
         }
         if from_date:
             params["published_at_gte"] = from_date.isoformat()
-        response = await self.client.get(SPACEFLIGHT_BASE_URL, params=params)
-        response.raise_for_status()
-        return response.json()
+        return await fetch_json(self.client, "spaceflight", SPACEFLIGHT_BASE_URL, params, self.upstream_cache)
 
 
     def normalize(self, raw: dict, **kwargs) -> list[dict[str, Any]]:
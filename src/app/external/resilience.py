@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+import httpx
+
+from src.app.core.config import settings
+from src.app.core.metrics import (
+    register_collector,
+    upstream_circuit_transitions_total,
+    upstream_hedged_requests_total,
+    upstream_retries_total,
+)
+
+
+logger = logging.getLogger("import")
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+# Ответы, после которых GET имеет смысл повторить; 4xx, кроме 429, — ошибка запроса, а не upstream
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, source: str, retry_after: float):
+        super().__init__(f"Circuit for {source} is open, retry in {retry_after:.1f}s")
+        self.source = source
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    # Состояние живёт в event loop процесса, как и метрики, поэтому без блокировок.
+    # closed -> open после failure_threshold ошибок подряд; через open_seconds пропускается
+    # одна пробная попытка (half_open): успех закрывает цепь, ошибка снова открывает
+    def __init__(self, source: str, failure_threshold: int, open_seconds: float):
+        self.source = source
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def retry_after(self) -> float:
+        return max(self.opened_at + self.open_seconds - time.monotonic(), 0.0)
+
+    def allow(self) -> bool:
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        self._probe_in_flight = False
+        self.failures = 0
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            self._transition(OPEN)
+
+    def release(self):
+        # Попытку отменили (проиграла hedge-гонку, клиент ушёл): исход неизвестен, пробу можно повторить
+        self._probe_in_flight = False
+
+    def _transition(self, state: str):
+        logger.log(logging.WARNING if state == OPEN else logging.INFO,
+                   f"Upstream {self.source} circuit: {self.state} -> {state}")
+        self.state = state
+        upstream_circuit_transitions_total.inc(self.source, state)
+
+
+class UpstreamPolicy:
+    # Circuit breaker, повторы с jitter и hedged-запросы для идемпотентных GET одного upstream
+
+    def __init__(self, source: str):
+        self.source = source
+        self.breaker = CircuitBreaker(source, settings.UPSTREAM_BREAKER_FAILURES, settings.UPSTREAM_BREAKER_OPEN_SECONDS)
+        self.attempts = max(settings.UPSTREAM_RETRY_ATTEMPTS, 1)
+        self.base_delay = settings.UPSTREAM_RETRY_BASE_DELAY
+        self.max_delay = settings.UPSTREAM_RETRY_MAX_DELAY
+        self.deadline = settings.UPSTREAM_RETRY_DEADLINE_SECONDS
+        self.hedge_enabled = settings.UPSTREAM_HEDGE_ENABLED
+        # Длительности успешных ответов: по ним считается задержка перед hedge-запросом
+        self.latencies: deque[float] = deque(maxlen=settings.UPSTREAM_LATENCY_WINDOW)
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.hedge_enabled or len(self.latencies) < settings.UPSTREAM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        quantile = ordered[int(settings.UPSTREAM_HEDGE_QUANTILE * (len(ordered) - 1))]
+        return max(quantile, settings.UPSTREAM_HEDGE_MIN_DELAY_MS / 1000)
+
+    def backoff(self, attempt: int) -> float:
+        # "Full jitter": равномерно в [0, min(max_delay, base * 2^attempt)], чтобы клиенты не повторяли синхронно
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def _attempt(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.source, self.breaker.retry_after())
+        start = time.perf_counter()
+        try:
+            response = await send()
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+            self.latencies.append(time.perf_counter() - start)
+        return response
+
+    async def _hedged(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._attempt(send)
+
+        primary = asyncio.ensure_future(self._attempt(send))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+
+            # Основной запрос дольше p95 — дублируем его; побеждает первый успешный ответ, второй отменяется
+            hedge = asyncio.ensure_future(self._attempt(send))
+            upstream_hedged_requests_total.inc(self.source, "sent")
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 500:
+                        if task is hedge:
+                            upstream_hedged_requests_total.inc(self.source, "won")
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        # Обе попытки неудачны: ответ upstream информативнее исключения
+        for task in (primary, hedge):
+            if task.exception() is None:
+                return task.result()
+        raise primary.exception()
+
+    async def get(self, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            error = None
+            try:
+                # Бюджет ограничивает и попытку в полёте, а не только паузы между повторами
+                response = await asyncio.wait_for(self._hedged(send), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                raise httpx.TimeoutException(f"{self.source}: retry budget of {self.deadline}s exhausted")
+            except httpx.TransportError as e:
+                error = e
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+
+            attempt += 1
+            delay = self.backoff(attempt)
+            if attempt >= self.attempts or time.monotonic() + delay >= deadline:
+                if error is not None:
+                    raise error
+                return response
+            upstream_retries_total.inc(self.source)
+            await asyncio.sleep(delay)
+
+    def snapshot(self) -> dict[str, Any]:
+        hedge_delay = self.hedge_delay()
+        return {
+            "source": self.source,
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "retry_after_seconds": round(self.breaker.retry_after(), 3) if self.breaker.state == OPEN else 0,
+            "latency_samples": len(self.latencies),
+            "hedge_delay_ms": round(hedge_delay * 1000, 1) if hedge_delay is not None else None,
+        }
+
+
+_policies: dict[str, UpstreamPolicy] = {}
+
+
+def upstream_policy(source: str) -> UpstreamPolicy:
+    policy = _policies.get(source)
+    if policy is None:
+        policy = _policies[source] = UpstreamPolicy(source)
+    return policy
+
+
+def upstream_states() -> list[dict[str, Any]]:
+    return [policy.snapshot() for policy in _policies.values()]
+
+
+def render_circuit_states() -> Iterator[str]:
+    yield "# HELP upstream_circuit_state Upstream circuit breaker state (0 closed, 1 half-open, 2 open)"
+    yield "# TYPE upstream_circuit_state gauge"
+    for source, policy in _policies.items():
+        yield f'upstream_circuit_state{{source="{source}"}} {STATE_VALUES[policy.breaker.state]}'
+
+
+register_collector(render_circuit_states)
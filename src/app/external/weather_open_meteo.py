@@ -1,8 +1,8 @@
-from typing import Any
+from typing import Any, Optional
 
 import httpx
 
-from src.app.core.http import create_http_client
+from src.app.cache.upstream import UpstreamCache, fetch_json
 from src.app.external.base import ExternalImporter
 
 
@@ -11,20 +11,20 @@ RAIN_CODES = {51, 52, 53, 54, 55, 56, 57, 61, 62, 63, 64, 65, 66, 67, 80, 81, 82
 
 
 class WeatherImporter(ExternalImporter):
-    def __init__(self, http_client: httpx.AsyncClient):
+    def __init__(self, http_client: httpx.AsyncClient, upstream_cache: Optional[UpstreamCache] = None):
         self.client = http_client
+        self.upstream_cache = upstream_cache
 
     async def fetch_raw(self, lat: float, lon: float, days: int = 3, request_id: str = None) -> dict:
+        # Координаты округляются до той же точности, что и source_id, чтобы соседние точки делили кэш
         params = {
-            "latitude": lat,
-            "longitude": lon,
+            "latitude": round(lat, 2),
+            "longitude": round(lon, 2),
             "daily": "weathercode,temperature_2m_max,temperature_2m_min",
             "forecast_days": days,
             "timezone": "auto"
         }
-        response = await self.client.get(OPEN_METEO_BASE_URL, params=params)
-        response.raise_for_status()
-        return response.json()
+        return await fetch_json(self.client, "open-meteo", OPEN_METEO_BASE_URL, params, self.upstream_cache)
 
 
     def normalize(
@@ -7,8 +7,9 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
-from starlette.responses import HTMLResponse, JSONResponse
+from starlette.responses import HTMLResponse, JSONResponse, PlainTextResponse
 
+from src.app.api.admin import router as admin_router
 from src.app.api.auth import router as auth_router
 from src.app.api.importers import router as import_router
 from src.app.api.tasks import router as tasks_router
@@ -16,6 +17,8 @@ from src.app.core.config import settings
 from src.app.core.deps import init_dependencies, close_dependencies
 from src.app.middleware.request_id import RequestTracingMiddleware
 from src.app.core.logging import init_logging, stop_logging
+from src.app.core.metrics import render_metrics
+from src.app.services.import_worker import import_worker_pool
 from src.app.services.scheduler import scheduler
 
 
@@ -25,13 +28,15 @@ async def lifespan(app: FastAPI):
     await init_dependencies()
     init_logging()
     logging.info("Application started")
+    import_worker_pool.start(settings.IMPORT_JOBS_WORKERS)
     if settings.SCHEDULER_ENABLED:
-        scheduler.start()
+        await scheduler.start()
     yield
 
     # Shutdown
+    await import_worker_pool.stop()
     if settings.SCHEDULER_ENABLED:
-        scheduler.shutdown()
+        await scheduler.shutdown()
     await close_dependencies()
     stop_logging()
 
@@ -68,10 +73,16 @@ app.add_middleware(RequestTracingMiddleware)
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(tasks_router, prefix="/tasks", tags=["tasks"])
 app.include_router(import_router, prefix="/import", tags=["import"])
+app.include_router(admin_router, prefix="/admin", tags=["admin"])
 
 templates = Jinja2Templates(directory=str(settings.TEMPLATES_DIR))
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/ui/tasks", response_class=HTMLResponse, tags=["ui"])
 async def ui_tasks():
     html = """<!doctype html><html lang="ru"><head>
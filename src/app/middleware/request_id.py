@@ -1,32 +1,69 @@
 import time
 import uuid
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from src.app.core.logging import request_id_var, user_id_var
-from src.app.core.security import decode_token
+from src.app.core.metrics import http_request_duration, http_requests_total
 
 
-class RequestTracingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
-        request_id_var.set(request_id)
+def route_template(scope: Scope) -> str:
+    # Шаблон маршрута вместо сырого пути, чтобы id задач не раздували число серий.
+    # Обычно include_router копирует маршруты с префиксом, и route.path — готовый шаблон. FastAPI 0.14x
+    # подключает роутеры лениво, и тогда route.path локален для роутера ("/{task_id}"): только в этом
+    # случае префикс восстанавливается из фактического пути
+    route = scope.get("route")
+    if route is None or not hasattr(route, "path_format"):
+        return "unmatched"
+    try:
+        concrete = route.path_format.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return route.path
+    path = scope["path"]
+    if concrete == path or not path.endswith(concrete):
+        return route.path
+    return path[:len(path) - len(concrete)] + route.path
 
-        credentials = request.headers.get("Authorization")
-        if credentials:
-            token = credentials.split()[1]
-            user_id = decode_token(token).get("sub")
-            user_id_var.set(user_id)
 
+class RequestTracingMiddleware:
+    # Чистый ASGI: без отдельной задачи и обёртки потока на каждый запрос, стриминг проходит как есть.
+    # user_id в контекст логов кладёт get_current_user, токен здесь не разбирается
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        request.state.request_id = request_id
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        start = time.perf_counter()
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+                break
+        request_id = request_id or str(uuid.uuid4())
 
-        response = await call_next(request)
+        request_id_token = request_id_var.set(request_id)
+        user_id_token = user_id_var.set("system")
+        scope.setdefault("state", {})["request_id"] = request_id
 
-        duration_ms = round((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        status_code = 500
 
-        response.headers["X-Request-ID"] = request.state.request_id
-        response.headers["X-Response-Time"] = str(duration_ms)
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                duration_ms = round((time.perf_counter() - start) * 1000)
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-ID"] = request_id
+                headers["X-Response-Time"] = str(duration_ms)
+            await send(message)
 
-        return response
\ No newline at end of file
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route_path = route_template(scope)
+            http_request_duration.observe(time.perf_counter() - start, scope["method"], route_path)
+            http_requests_total.inc(scope["method"], route_path, str(status_code))
+            request_id_var.reset(request_id_token)
+            user_id_var.reset(user_id_token)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import date
+from datetime import date, datetime
 from typing import Literal, Optional
 
 from pydantic import BaseModel, constr, Field
@@ -61,3 +61,16 @@ class NewsImportRequest(BaseModel):
     from_date: Optional[date] = Field(default=None, alias="from")
     limit: int = Field(default=20, ge=1, le=50)
 
+
+class ImportJobOut(BaseModel):
+    id: str
+    source: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    stage: Optional[str] = None
+    items: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[ImportResult] = None
+    error: Optional[str] = None
+    error_status: Optional[int] = None
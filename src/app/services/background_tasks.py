@@ -1,93 +1,132 @@
+import asyncio
 import logging
 from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
 
 from src.app.core.config import settings
-from src.app.db.repositories import MotorTasksRepository, MotorUsersRepository
-from src.app.core.deps import get_http_client, get_mongo_client, get_mongo_db, get_nager_importer, get_weather_importer
-from src.app.services.import_service import execute_import
+from src.app.db.repositories import MotorUsersRepository
+from src.app.core.deps import (
+    get_http_pool,
+    get_mongo_client,
+    get_mongo_db,
+    get_tasks_repo,
+    get_nager_importer,
+    get_weather_importer,
+    get_redis_client,
+    get_upstream_cache,
+    get_cache_service,
+    get_reminder_queue
+)
+from src.app.cache.service import invalidate_user_cache
+from src.app.services.import_service import import_normalized
+from src.app.services.retention import RetentionEngine
 
 
 logger = logging.getLogger("scheduler")
 
 
-async def auto_import_task():
+def auto_import_plan(user_id: str, year: int) -> list[tuple[str, dict[str, Any], dict[str, Any]]]:
+    # (источник, fetch_kwargs, normalize_kwargs) для пользователя;
+    # одинаковые параметры у разных пользователей означают один общий запрос к upstream
+    return [
+        ("nager", {"year": year, "country": "RU"}, {"country": "RU"}),
+        ("open-meteo", {"lat": 0, "lon": 0, "days": 3}, {"lat": 0, "lon": 0, "hot_from": 20, "cold_to": 0}),
+    ]
+
+
+async def auto_import_task(keep_running: Optional[Callable[[], bool]] = None):
     try:
         db = await get_mongo_db(await get_mongo_client())
-        tasks_repo = MotorTasksRepository(db["tasks"])
+        tasks_repo = await get_tasks_repo(db)
         users_repo = MotorUsersRepository(db["users"])
 
-        http_client = await get_http_client()
-        nager = await get_nager_importer(http_client)
-        weather = await get_weather_importer(http_client)
-
-        users = await users_repo.list_all()
+        http_pool = await get_http_pool()
+        redis = await get_redis_client()
+        cache = await get_cache_service(redis)
+        reminders = await get_reminder_queue(redis)
+        upstream_cache = await get_upstream_cache(redis)
+        importers = {
+            "nager": await get_nager_importer(http_pool, upstream_cache),
+            "open-meteo": await get_weather_importer(http_pool, upstream_cache),
+        }
+
+        year = datetime.now().year
+        semaphore = asyncio.Semaphore(settings.AUTO_IMPORT_CONCURRENCY)
+        datasets: dict[tuple, asyncio.Future] = {}
+
+        async def load_dataset(source: str, fetch_kwargs: dict, normalize_kwargs: dict) -> list[dict[str, Any]]:
+            importer = importers[source]
+            raw_data = await importer.fetch_raw(**fetch_kwargs)
+            return importer.normalize(raw_data, **normalize_kwargs)
+
+        def get_dataset(source: str, fetch_kwargs: dict, normalize_kwargs: dict) -> asyncio.Future:
+            key = (source, tuple(sorted(fetch_kwargs.items())), tuple(sorted(normalize_kwargs.items())))
+            if key not in datasets:
+                datasets[key] = asyncio.ensure_future(load_dataset(source, fetch_kwargs, normalize_kwargs))
+            return datasets[key]
+
+        async def import_user(user_id: str) -> int:
+            imported = 0
+            for source, fetch_kwargs, normalize_kwargs in auto_import_plan(user_id, year):
+                normalized = await get_dataset(source, fetch_kwargs, normalize_kwargs)
+                async with semaphore:
+                    # insert_many_generic проставляет user_id в элементы, поэтому каждому пользователю своя копия
+                    result = await import_normalized(user_id, tasks_repo, [dict(it) for it in normalized])
+                imported += result.imported
+                await reminders.schedule(task.model_dump() for task in result.details)
+            if imported:
+                await invalidate_user_cache(user_id, resource="tasks", cache=cache)
+            return imported
 
         imported_count = 0
-        for user in users:
-            holidays = await execute_import(nager, user['id'], tasks_repo,
-                                      fetch_kwargs={
-                                          "year": datetime.now().year,
-                                          "country": "RU",
-                                      },
-                                      normalize_kwargs={
-                                          "country": "RU"
-                                      })
-            weather_tasks = await execute_import(weather, user['id'], tasks_repo,
-                                      fetch_kwargs={
-                                          "lat": 0,
-                                          "lon": 0,
-                                          "days": 3,
-                                      },
-                                      normalize_kwargs={"lat": 0, "lon": 0, "hot_from": 20, "cold_to": 0})
-            imported_count += holidays.imported + weather_tasks.imported
-
-        logger.info(f"Auto-import completed: imported {imported_count} tasks from {len(users)} users")
+        users_count = 0
+        failed_count = 0
+        async for user_ids in users_repo.iter_id_batches(settings.AUTO_IMPORT_BATCH_SIZE):
+            if keep_running is not None and not keep_running():
+                logger.warning(f"Auto-import stopped after {users_count} users: scheduler leadership lost")
+                break
+            results = await asyncio.gather(*(import_user(user_id) for user_id in user_ids), return_exceptions=True)
+            for user_id, result in zip(user_ids, results):
+                if isinstance(result, Exception):
+                    failed_count += 1
+                    logger.error(f"Auto-import failed for user {user_id}: {result}")
+                else:
+                    imported_count += result
+            users_count += len(user_ids)
+
+        logger.info(
+            f"Auto-import completed: imported {imported_count} tasks from {users_count} users "
+            f"({len(datasets)} datasets fetched, {failed_count} users failed)"
+        )
     except Exception as e:
         logger.error(f"Auto-import failed: {e}", exc_info=True)
 
 
-async def cleanup_expired_tasks():
+async def cleanup_expired_tasks(keep_running: Optional[Callable[[], bool]] = None):
     try:
         db = await get_mongo_db(await get_mongo_client())
-        tasks_repo = MotorTasksRepository(db["tasks"])
+        tasks_repo = await get_tasks_repo(db)
 
-        cutoff_date = datetime.utcnow() - timedelta(days=settings.CLEANUP_EXPIRED_DAYS)
+        archive = db[settings.RETENTION_ARCHIVE_COLLECTION] if settings.RETENTION_ARCHIVE_ENABLED else None
 
-        deleted_completed = await tasks_repo.delete_many(
-            status="completed",
-            date_lt=cutoff_date
-        )
+        cutoff_date = datetime.utcnow() - timedelta(days=settings.CLEANUP_EXPIRED_DAYS)
 
-        deleted_expired = await tasks_repo.delete_many(
-            date_lt=cutoff_date
+        engine = RetentionEngine(
+            tasks_repo,
+            batch_size=settings.RETENTION_BATCH_SIZE,
+            max_docs_per_second=settings.RETENTION_MAX_DOCS_PER_SECOND,
+            pause_seconds=settings.RETENTION_BATCH_PAUSE_MS / 1000,
+            max_batches=settings.RETENTION_MAX_BATCHES_PER_RUN,
+            archive=archive,
+            cache=await get_cache_service(await get_redis_client()),
+            keep_running=keep_running
         )
+        report = await engine.run(cutoff_date)
 
-        total_deleted = deleted_completed + deleted_expired
-        logger.info(f"Cleanup completed: removed {total_deleted} expired tasks")
-    except Exception as e:
-        logger.error(f"Cleanup failed: {e}", exc_info=True)
-
-
-async def check_reminders():
-    try:
-        db = await get_mongo_db(await get_mongo_client())
-        tasks_repo = MotorTasksRepository(db["tasks"])
-
-        now = datetime.utcnow()
-        reminder_time = now + timedelta(minutes=settings.REMINDER_BEFORE_MINUTES)
-
-        upcoming_tasks = await tasks_repo.find_upcoming(
-            date_from=now,
-            date_to=reminder_time
+        logger.info(
+            f"Cleanup {'completed' if report.complete else 'paused'}: removed {report.deleted} tasks "
+            f"older than {report.cutoff} ({report.archived} archived) in {report.batches} batches, "
+            f"{report.elapsed:.1f}s, {report.docs_per_second:.0f} docs/s"
         )
-
-        for task in upcoming_tasks:
-            logger.info(
-                f"Reminder: '{task['title']}' in {settings.REMINDER_BEFORE_MINUTES} minutes",
-                extra={"user_id": task["user_id"], "task_id": task["id"]}
-            )
-
-        if upcoming_tasks:
-            logger.info(f"Reminders checked: {len(upcoming_tasks)} tasks found")
     except Exception as e:
-        logger.error(f"Reminders check failed: {e}", exc_info=True)
\ No newline at end of file
+        logger.error(f"Cleanup failed: {e}", exc_info=True)
\ No newline at end of file
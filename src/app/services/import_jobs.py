@@ -0,0 +1,160 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import httpx
+import redis.asyncio as aioredis
+
+from src.app.cache.keys import (
+    make_import_job_key,
+    make_import_processing_key,
+    make_import_queue_key,
+    make_import_worker_key,
+)
+from src.app.core.config import settings
+from src.app.external.resilience import CircuitOpenError
+from src.app.models.tasks import NewsImportRequest, WeatherImportRequest
+
+# Имя источника -> название upstream в ошибках
+IMPORT_SOURCES = {
+    "nager": "Nager.Date",
+    "open-meteo": "OpenMeteo",
+    "spaceflight": "SpaceflightNews",
+}
+
+
+def import_arguments(source: str, params: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any]]:
+    # params — JSON-совместимые параметры запроса: так их можно положить в очередь и восстановить в воркере
+    if source == "nager":
+        return {"year": params["year"], "country": params["country"]}, {"country": params["country"]}
+    if source == "open-meteo":
+        body = WeatherImportRequest.model_validate(params)
+        return (
+            {"lat": body.lat, "lon": body.lon, "days": body.days},
+            {"lat": body.lat, "lon": body.lon, "hot_from": body.hot_from, "cold_to": body.cold_to},
+        )
+    if source == "spaceflight":
+        body = NewsImportRequest.model_validate(params)
+        return {"q": body.q, "from_date": body.from_date, "limit": body.limit}, {}
+    raise ValueError(f"Unknown import source: {source}")
+
+
+def import_error(source: str, exc: Exception) -> tuple[int, str]:
+    if isinstance(exc, CircuitOpenError):
+        return 503, f"{IMPORT_SOURCES[source]} unavailable"
+    if isinstance(exc, httpx.TimeoutException):
+        return 502, "Service unavailable"
+    if isinstance(exc, httpx.HTTPStatusError):
+        if exc.response.status_code >= 500:
+            return 502, "Service unavailable"
+        return 400, "Bad Request"
+    if isinstance(exc, RuntimeError):
+        return 502, f"{IMPORT_SOURCES[source]} unavailable"
+    return 500, "Internal server error"
+
+
+# HSET только для существующего задания: после истечения TTL hash не пересоздаётся без user_id и срока жизни
+UPDATE_JOB_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ImportJobQueue:
+    # Очередь импортов в Redis: id задания в списке, состояние — в hash с TTL.
+    # Взятое задание лежит в списке processing своего пула воркеров (owner), пока не завершится:
+    # пул, переставший обновлять heartbeat, считается упавшим, и его задания возвращаются в очередь
+    JSON_FIELDS = ("params", "result")
+    INT_FIELDS = ("items", "error_status")
+
+    def __init__(self, client: aioredis.Redis):
+        self.client = client
+        self.queue_key = make_import_queue_key()
+
+    async def enqueue(self, source: str, user_id: str, params: dict[str, Any], request_id: str) -> Optional[str]:
+        if await self.client.llen(self.queue_key) >= settings.IMPORT_JOBS_MAX_QUEUE:
+            return None
+        job_id = uuid.uuid4().hex
+        key = make_import_job_key(job_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={
+                "id": job_id,
+                "source": source,
+                "user_id": user_id,
+                "params": json.dumps(params),
+                "request_id": request_id,
+                "status": "queued",
+                "created_at": _now(),
+            })
+            pipe.expire(key, settings.IMPORT_JOB_TTL_SECONDS)
+            pipe.rpush(self.queue_key, job_id)
+            await pipe.execute()
+        return job_id
+
+    async def dequeue(self, owner: str, timeout: float) -> Optional[str]:
+        job_id = await self.client.blmove(self.queue_key, make_import_processing_key(owner), timeout, "LEFT", "RIGHT")
+        return job_id.decode() if isinstance(job_id, bytes) else job_id
+
+    async def ack(self, owner: str, job_id: str):
+        await self.client.lrem(make_import_processing_key(owner), 1, job_id)
+
+    async def requeue(self, owner: str, job_id: str):
+        # В начало очереди: задание уже отстояло своё; повторный запуск безопасен, импорт идемпотентен
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.lrem(make_import_processing_key(owner), 1, job_id)
+            pipe.lpush(self.queue_key, job_id)
+            await pipe.execute()
+        await self.update(job_id, status="queued")
+
+    async def heartbeat(self, owner: str, ttl: int):
+        await self.client.set(make_import_worker_key(owner), 1, ex=ttl)
+
+    async def release(self, owner: str):
+        await self.client.delete(make_import_worker_key(owner))
+
+    async def recover_orphaned(self) -> int:
+        # LMOVE атомарен, поэтому каждое задание вернётся в очередь ровно один раз, даже если восстановление
+        # одновременно запустили несколько пулов
+        recovered = 0
+        prefix = make_import_processing_key("")
+        async for key in self.client.scan_iter(match=prefix + "*"):
+            key = key.decode() if isinstance(key, bytes) else key
+            if await self.client.exists(make_import_worker_key(key[len(prefix):])):
+                continue
+            while job_id := await self.client.lmove(key, self.queue_key, "LEFT", "LEFT"):
+                await self.update(job_id.decode() if isinstance(job_id, bytes) else job_id, status="queued")
+                recovered += 1
+        return recovered
+
+    async def update(self, job_id: str, **fields: Any) -> bool:
+        args = []
+        for name, value in fields.items():
+            args += [name, json.dumps(value) if name in self.JSON_FIELDS else value]
+        return bool(await self.client.eval(
+            UPDATE_JOB_SCRIPT, 1, make_import_job_key(job_id), settings.IMPORT_JOB_TTL_SECONDS, *args
+        ))
+
+    async def get(self, job_id: str) -> Optional[dict[str, Any]]:
+        raw = await self.client.hgetall(make_import_job_key(job_id))
+        if not raw:
+            return None
+        job = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in raw.items()
+        }
+        for name in self.JSON_FIELDS:
+            if name in job:
+                job[name] = json.loads(job[name])
+        for name in self.INT_FIELDS:
+            if name in job:
+                job[name] = int(job[name])
+        return job
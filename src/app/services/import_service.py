@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Awaitable, Callable, Optional
 from src.app.external.base import ExternalImporter
 from src.app.db.repositories import TasksRepository
 from src.app.models.tasks import ImportResult, ImportTaskOut
@@ -9,14 +9,27 @@ async def execute_import(
         user_id: str,
         tasks_repo: TasksRepository,
         fetch_kwargs: dict[str, Any],
-        normalize_kwargs: dict[str, Any] = None
+        normalize_kwargs: dict[str, Any] = None,
+        progress: Optional[Callable[..., Awaitable[None]]] = None
 ) -> ImportResult:
     normalize_kwargs = normalize_kwargs or {}
 
+    if progress:
+        await progress("fetching")
     raw_data = await importer.fetch_raw(**fetch_kwargs)
 
     normalized = importer.normalize(raw_data, **normalize_kwargs)
+    if progress:
+        await progress("saving", items=len(normalized))
 
+    return await import_normalized(user_id, tasks_repo, normalized)
+
+
+async def import_normalized(
+        user_id: str,
+        tasks_repo: TasksRepository,
+        normalized: list[dict[str, Any]]
+) -> ImportResult:
     inserted_count, inserted_docs = await tasks_repo.insert_many_generic(
         user_id=user_id,
         items=normalized
@@ -0,0 +1,175 @@
+# Пул воркеров асинхронных импортов. По умолчанию воркеры живут в процессе API (IMPORT_JOBS_WORKERS);
+# отдельным процессом: IMPORT_JOBS_WORKERS=0 для API и `python -m src.app.services.import_worker --workers 8`
+import argparse
+import asyncio
+import contextlib
+import logging
+import uuid
+from datetime import datetime, timezone
+
+from redis import RedisError
+
+from src.app.cache.service import invalidate_user_cache
+from src.app.core.config import settings
+from src.app.core.deps import (
+    close_dependencies,
+    get_background_redis_client,
+    get_cache_service,
+    get_http_pool,
+    get_mongo_client,
+    get_mongo_db,
+    get_news_importer,
+    get_nager_importer,
+    get_redis_client,
+    get_reminder_queue,
+    get_tasks_repo,
+    get_upstream_cache,
+    get_weather_importer,
+    init_dependencies,
+)
+from src.app.core.logging import init_logging, request_id_var, stop_logging, user_id_var
+from src.app.services.import_jobs import ImportJobQueue, import_arguments, import_error
+from src.app.services.import_service import execute_import
+
+
+logger = logging.getLogger("import")
+
+IMPORTER_FACTORIES = {
+    "nager": get_nager_importer,
+    "open-meteo": get_weather_importer,
+    "spaceflight": get_news_importer,
+}
+DEQUEUE_TIMEOUT_SECONDS = 1
+# Пул без heartbeat дольше этого срока считается упавшим: его незавершённые задания возвращаются в очередь
+WORKER_HEARTBEAT_TTL_SECONDS = 30
+
+
+async def run_import_job(queue: ImportJobQueue, job_id: str):
+    job = await queue.get(job_id)
+    if job is None:
+        # Состояние истекло по TTL раньше, чем до задания дошла очередь
+        return
+    source, user_id = job["source"], job["user_id"]
+    request_id_var.set(job["request_id"])
+    user_id_var.set(user_id)
+    if not await queue.update(job_id, status="running", started_at=datetime.now(timezone.utc).isoformat()):
+        return
+
+    async def progress(stage: str, items: int | None = None):
+        await queue.update(job_id, stage=stage, **({"items": items} if items is not None else {}))
+
+    try:
+        redis = await get_redis_client()
+        tasks_repo = await get_tasks_repo(await get_mongo_db(await get_mongo_client()))
+        importer = await IMPORTER_FACTORIES[source](await get_http_pool(), await get_upstream_cache(redis))
+        fetch_kwargs, normalize_kwargs = import_arguments(source, job["params"])
+        fetch_kwargs["request_id"] = job["request_id"]
+        result = await execute_import(importer, user_id, tasks_repo, fetch_kwargs, normalize_kwargs, progress=progress)
+
+        await invalidate_user_cache(user_id, resource="tasks", cache=await get_cache_service(redis))
+        await (await get_reminder_queue(redis)).schedule(task.model_dump() for task in result.details)
+    except Exception as e:
+        error_status, detail = import_error(source, e)
+        if error_status == 500:
+            logger.error(f"Import job {job_id} failed: {e}", exc_info=True)
+        await queue.update(job_id, status="failed", error=detail, error_status=error_status,
+                           finished_at=datetime.now(timezone.utc).isoformat())
+        return
+
+    await queue.update(job_id, status="succeeded", stage="done", result=result.model_dump(mode="json"),
+                       finished_at=datetime.now(timezone.utc).isoformat())
+    logger.info(f"Import job {job_id} ({source}) finished: imported {result.imported}, skipped {result.skipped}")
+
+
+async def _worker(number: int, owner: str):
+    queue = ImportJobQueue(await get_background_redis_client())
+    while True:
+        try:
+            job_id = await queue.dequeue(owner, DEQUEUE_TIMEOUT_SECONDS)
+        except RedisError as e:
+            logger.warning(f"Import worker {number}: queue unavailable: {e}")
+            await asyncio.sleep(DEQUEUE_TIMEOUT_SECONDS)
+            continue
+        if not job_id:
+            continue
+
+        try:
+            await run_import_job(queue, job_id)
+        except asyncio.CancelledError:
+            # Остановка посреди задания (деплой, shutdown): задание не теряется, а снова встаёт в очередь
+            with contextlib.suppress(RedisError):
+                await queue.requeue(owner, job_id)
+            raise
+        except Exception as e:
+            logger.error(f"Import worker {number}: job {job_id} crashed: {e}", exc_info=True)
+            with contextlib.suppress(RedisError):
+                await queue.update(job_id, status="failed", error="Internal server error", error_status=500,
+                                   finished_at=datetime.now(timezone.utc).isoformat())
+        try:
+            await queue.ack(owner, job_id)
+        except RedisError as e:
+            logger.warning(f"Import worker {number}: failed to ack job {job_id}: {e}")
+
+
+class ImportWorkerPool:
+    def __init__(self):
+        self.owner = uuid.uuid4().hex
+        self._supervisor: asyncio.Task | None = None
+        self._workers: list[asyncio.Task] = []
+
+    def start(self, size: int):
+        if size:
+            self._supervisor = asyncio.create_task(self._supervise(size))
+
+    async def _supervise(self, size: int):
+        # Воркеры стартуют после первого heartbeat, иначе другой пул может принять их задания за брошенные
+        queue = ImportJobQueue(await get_background_redis_client())
+        while True:
+            try:
+                await queue.heartbeat(self.owner, WORKER_HEARTBEAT_TTL_SECONDS)
+                recovered = await queue.recover_orphaned()
+                if recovered:
+                    logger.warning(f"Requeued {recovered} import job(s) of stopped workers")
+            except RedisError as e:
+                logger.warning(f"Import workers heartbeat failed: {e}")
+            if not self._workers:
+                # Каждый воркер — отдельная задача со своим контекстом, поэтому request_id/user_id заданий не смешиваются
+                self._workers = [asyncio.create_task(_worker(i, self.owner)) for i in range(size)]
+                logger.info(f"Import workers started: {size}")
+            await asyncio.sleep(WORKER_HEARTBEAT_TTL_SECONDS / 3)
+
+    async def stop(self):
+        tasks = [*self._workers, *([self._supervisor] if self._supervisor else [])]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        if self._supervisor is not None:
+            with contextlib.suppress(RedisError):
+                await ImportJobQueue(await get_background_redis_client()).release(self.owner)
+        self._workers = []
+        self._supervisor = None
+
+
+import_worker_pool = ImportWorkerPool()
+
+
+async def main(workers: int):
+    await init_dependencies(import_workers=workers)
+    init_logging()
+    import_worker_pool.start(workers)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await import_worker_pool.stop()
+        await close_dependencies()
+        stop_logging()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=max(settings.IMPORT_JOBS_WORKERS, 1))
+    args = parser.parse_args()
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(main(args.workers))
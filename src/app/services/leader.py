@@ -0,0 +1,95 @@
+import asyncio
+import contextlib
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Optional
+
+import redis.asyncio as aioredis
+from redis import RedisError
+
+from src.app.cache.redis import RELEASE_LOCK_SCRIPT
+
+
+logger = logging.getLogger("scheduler")
+
+# Продлеваем свою аренду или занимаем свободную; чужую не трогаем
+ACQUIRE_OR_RENEW_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+if not current then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+# Как часто (в долях ttl) держатель продлевает аренду и как часто остальные пытаются её занять
+RENEW_FRACTION = 1 / 3
+POLL_FRACTION = 1 / 10
+
+
+class LeaderLease:
+    # Аренда лидерства в Redis: держатель продлевает её каждые ttl/3, остальные пытаются занять её каждые ttl/10.
+    # Ключ живёт ttl - ttl/10, поэтому после падения лидера новый появляется не позже чем через ttl.
+    # Локально лидерство считается действительным до момента отправки последнего продления + срок ключа,
+    # то есть гарантированно истекает не позже ключа в Redis
+
+    def __init__(self, client: aioredis.Redis, key: str, ttl_seconds: float):
+        self.client = client
+        self.key = key
+        self.ttl_seconds = ttl_seconds
+        self.poll_seconds = ttl_seconds * POLL_FRACTION
+        self.renew_seconds = ttl_seconds * RENEW_FRACTION
+        self.lease_seconds = ttl_seconds - self.poll_seconds
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self._valid_until = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    async def _acquire_or_renew(self):
+        was_leader = self.is_leader
+        started = time.monotonic()
+        try:
+            held = await self.client.eval(
+                ACQUIRE_OR_RENEW_SCRIPT, 1, self.key, self.token, int(self.lease_seconds * 1000)
+            )
+        except RedisError as e:
+            # Без ответа Redis лидерство доживает до локального срока и не продлевается
+            logger.warning(f"Scheduler lease renewal failed: {e}")
+            held = 0
+        else:
+            self._valid_until = started + self.lease_seconds if held == 1 else 0.0
+
+        if self.is_leader and not was_leader:
+            logger.info(f"Scheduler leadership acquired by {self.token}")
+        elif was_leader and not self.is_leader:
+            logger.warning(f"Scheduler leadership lost by {self.token}")
+
+    async def _run(self):
+        while True:
+            await self._acquire_or_renew()
+            await asyncio.sleep(self.renew_seconds if self.is_leader else self.poll_seconds)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self.is_leader:
+            # Освобождаем аренду сразу, чтобы другой воркер не ждал истечения ttl
+            self._valid_until = 0.0
+            with contextlib.suppress(RedisError):
+                await self.client.eval(RELEASE_LOCK_SCRIPT, 1, self.key, self.token)
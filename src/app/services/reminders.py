@@ -0,0 +1,175 @@
+import asyncio
+import contextlib
+import logging
+import time
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Any, Iterable
+
+import redis.asyncio as aioredis
+from redis import RedisError
+
+from src.app.core.config import settings
+from src.app.cache.keys import make_reminder_backfill_key, make_reminder_queue_key, make_reminder_sent_key
+
+
+logger = logging.getLogger("scheduler")
+
+# Забираем и удаляем созревшие напоминания одной командой: параллельные потребители не получат одно и то же
+POP_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return due
+"""
+SENT_MARKER_TTL = 2 * 24 * 3600
+# Через сколько секунд повторить доставку, упавшую на временной ошибке Mongo/Redis
+DELIVERY_RETRY_SECONDS = 30
+BACKFILL_BATCH_SIZE = 1000
+# Метка "running" страхует от упавшего посреди backfill воркера: по её истечении backfill сделает следующий старт
+BACKFILL_LOCK_SECONDS = 3600
+
+
+def reminder_due_at(task_date: Any) -> float:
+    # Задачи привязаны к дню, поэтому напоминание — за REMINDER_BEFORE_MINUTES до начала дня (UTC)
+    day = task_date if isinstance(task_date, date) else date.fromisoformat(str(task_date)[:10])
+    start = datetime.combine(day, dt_time.min, tzinfo=timezone.utc)
+    return (start - timedelta(minutes=settings.REMINDER_BEFORE_MINUTES)).timestamp()
+
+
+def _day_end(task_date: Any) -> float:
+    day = task_date if isinstance(task_date, date) else date.fromisoformat(str(task_date)[:10])
+    return datetime.combine(day + timedelta(days=1), dt_time.min, tzinfo=timezone.utc).timestamp()
+
+
+class ReminderQueue:
+    # Отложенная очередь в sorted set: member — id задачи, score — момент напоминания.
+    # ZADD перезаписывает score, поэтому повторная постановка той же задачи идемпотентна
+
+    def __init__(self, client: aioredis.Redis):
+        self.client = client
+        self.key = make_reminder_queue_key()
+
+    async def schedule(self, tasks: Iterable[dict[str, Any]]) -> int:
+        if not settings.REMINDERS_ENABLED:
+            return 0
+        try:
+            return await self._schedule(tasks)
+        except RedisError as e:
+            logger.warning(f"Failed to schedule reminders: {e}")
+            return 0
+
+    async def _schedule(self, tasks: Iterable[dict[str, Any]]) -> int:
+        now = time.time()
+        due: dict[str, float] = {}
+        cancelled: list[str] = []
+        for task in tasks:
+            if task.get("status") == "done" or _day_end(task["date"]) <= now:
+                cancelled.append(task["id"])
+            else:
+                due[task["id"]] = reminder_due_at(task["date"])
+        async with self.client.pipeline(transaction=False) as pipe:
+            if due:
+                pipe.zadd(self.key, due)
+            if cancelled:
+                pipe.zrem(self.key, *cancelled)
+            await pipe.execute()
+        return len(due)
+
+    async def cancel(self, task_ids: Iterable[str]):
+        task_ids = list(task_ids)
+        if not settings.REMINDERS_ENABLED or not task_ids:
+            return
+        try:
+            await self.client.zrem(self.key, *task_ids)
+        except RedisError as e:
+            logger.warning(f"Failed to cancel reminders: {e}")
+
+    async def pop_due(self, now: float, limit: int) -> list[str]:
+        due = await self.client.eval(POP_DUE_SCRIPT, 1, self.key, now, limit)
+        return [task_id.decode() if isinstance(task_id, bytes) else task_id for task_id in due]
+
+    async def retry_later(self, task_ids: list[str], delay: float):
+        # NX: если задачу успели перепоставить с новой датой, её score не трогаем
+        await self.client.zadd(self.key, {task_id: time.time() + delay for task_id in task_ids}, nx=True)
+
+    async def mark_sent(self, task_id: str, date_iso: str) -> bool:
+        # Одно напоминание на задачу и день, даже если задачу перепоставили после отправки
+        return bool(await self.client.set(make_reminder_sent_key(task_id, date_iso), 1, nx=True, ex=SENT_MARKER_TTL))
+
+    async def backfill(self, tasks_repo) -> int:
+        # Задачи, созданные до появления очереди, ставятся один раз на окружение: проход делает один воркер
+        # (running — пока идёт, done — навсегда), остальные стартуют без него; при ошибке метка снимается.
+        # Задачи читаются пачками по _id, каждая пачка ставится одним pipeline ZADD
+        if not settings.REMINDERS_ENABLED:
+            return 0
+        key = make_reminder_backfill_key()
+        if not await self.client.set(key, "running", nx=True, ex=BACKFILL_LOCK_SECONDS):
+            return 0
+        today = datetime.combine(datetime.utcnow().date(), dt_time.min)
+        scheduled = 0
+        try:
+            async for batch in tasks_repo.iter_upcoming_batches(today, BACKFILL_BATCH_SIZE):
+                scheduled += await self._schedule(batch)
+        except BaseException:
+            with contextlib.suppress(RedisError):
+                await self.client.delete(key)
+            raise
+        await self.client.set(key, "done")
+        return scheduled
+
+
+async def deliver_reminder(queue: ReminderQueue, tasks_repo, task_id: str) -> bool:
+    task = await tasks_repo.get(task_id)
+    if not task or task["status"] == "done":
+        return False
+    if not await queue.mark_sent(task_id, str(task["date"])):
+        return False
+    logger.info(
+        f"Reminder: '{task['title']}' on {task['date']}",
+        extra={"user_id": task["user_id"], "task_id": task["id"]}
+    )
+    return True
+
+
+async def _deliver_batch(queue: ReminderQueue, tasks_repo, due: list[str]):
+    # Пачка уже удалена из очереди: ошибка одной доставки не должна терять остальные
+    failed = []
+    for task_id in due:
+        try:
+            await deliver_reminder(queue, tasks_repo, task_id)
+        except asyncio.CancelledError:
+            failed.extend(due[due.index(task_id):])
+            await queue.retry_later(failed, 0)
+            raise
+        except Exception as e:
+            logger.warning(f"Reminder for task {task_id} failed, retrying in {DELIVERY_RETRY_SECONDS}s: {e}")
+            failed.append(task_id)
+    if failed:
+        await queue.retry_later(failed, DELIVERY_RETRY_SECONDS)
+
+
+async def consume_reminders(queue: ReminderQueue, tasks_repo):
+    backfilled = False
+    while True:
+        try:
+            if not backfilled:
+                count = await queue.backfill(tasks_repo)
+                backfilled = True
+                if count:
+                    logger.info(f"Reminders backfilled: {count} upcoming tasks queued")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Reminders backfill failed, will retry: {e}", exc_info=True)
+
+        try:
+            due = await queue.pop_due(time.time(), settings.REMINDER_BATCH_SIZE)
+            await _deliver_batch(queue, tasks_repo, due)
+            if len(due) == settings.REMINDER_BATCH_SIZE:
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Reminders delivery failed: {e}", exc_info=True)
+        await asyncio.sleep(settings.REMINDER_POLL_SECONDS)
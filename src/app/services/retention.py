@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from src.app.cache.redis import RedisCache
+from src.app.cache.service import invalidate_user_cache
+from src.app.core.metrics import retention_tasks_total
+
+
+logger = logging.getLogger("scheduler")
+
+
+@dataclass
+class RetentionReport:
+    cutoff: str
+    archived: int = 0
+    deleted: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+    complete: bool = True
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.deleted / self.elapsed if self.elapsed else 0.0
+
+
+class RetentionEngine:
+    # Удаляет просроченные задачи ограниченными пачками с паузами между ними,
+    # чтобы очистка не конкурировала с запросами пользователей за I/O MongoDB
+
+    def __init__(
+            self,
+            tasks_repo,
+            *,
+            batch_size: int,
+            max_docs_per_second: float = 0,
+            pause_seconds: float = 0,
+            max_batches: int = 0,
+            archive: Optional[AsyncIOMotorCollection] = None,
+            cache: Optional[RedisCache] = None,
+            keep_running: Optional[Callable[[], bool]] = None
+    ):
+        self.tasks_repo = tasks_repo
+        self.batch_size = batch_size
+        self.max_docs_per_second = max_docs_per_second
+        self.pause_seconds = pause_seconds
+        self.max_batches = max_batches
+        self.archive = archive
+        self.cache = cache
+        self.keep_running = keep_running
+
+    async def run(self, cutoff: datetime) -> RetentionReport:
+        report = RetentionReport(cutoff=cutoff.strftime("%Y-%m-%d"))
+        start = time.perf_counter()
+        while True:
+            if self.max_batches and report.batches >= self.max_batches:
+                # Остаток дочистит следующий запуск по расписанию
+                report.complete = False
+                break
+            if self.keep_running is not None and not self.keep_running():
+                logger.warning(f"Retention stopped after {report.batches} batches: scheduler leadership lost")
+                report.complete = False
+                break
+
+            batch_start = time.perf_counter()
+            archived, deleted, user_ids = await self.tasks_repo.expire_batch(
+                report.cutoff, self.batch_size, self.archive)
+            # Кэши списков и ETag владельцев сбрасываются, иначе удалённые задачи отдавались бы до конца TTL
+            if self.cache is not None:
+                for user_id in user_ids:
+                    await invalidate_user_cache(user_id, resource="tasks", cache=self.cache)
+            batch_elapsed = time.perf_counter() - batch_start
+            if not deleted:
+                break
+
+            report.batches += 1
+            report.archived += archived
+            report.deleted += deleted
+            report.elapsed = time.perf_counter() - start
+            retention_tasks_total.inc("deleted", amount=deleted)
+            if archived:
+                retention_tasks_total.inc("archived", amount=archived)
+            logger.info(
+                f"Retention batch {report.batches}: deleted {deleted}, archived {archived} "
+                f"(total {report.deleted}, {report.docs_per_second:.0f} docs/s)"
+            )
+            if deleted < self.batch_size:
+                break
+
+            delay = self.pause_seconds
+            if self.max_docs_per_second:
+                delay = max(delay, deleted / self.max_docs_per_second - batch_elapsed)
+            await asyncio.sleep(delay)
+
+        report.elapsed = time.perf_counter() - start
+        return report
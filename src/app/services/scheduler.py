@@ -1,26 +1,59 @@
 import logging
+import time
+from functools import wraps
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
+from src.app.cache.keys import make_scheduler_lease_key
 from src.app.core.config import settings
+from src.app.core.deps import get_background_redis_client
+from src.app.core.metrics import scheduler_job_duration
 from src.app.services.background_tasks import (
     auto_import_task,
-    cleanup_expired_tasks,
-    check_reminders
+    cleanup_expired_tasks
 )
+from src.app.services.leader import LeaderLease
 
 logger = logging.getLogger("scheduler")
 
 
+def timed_job(job_id: str, func):
+    @wraps(func)
+    async def wrapper(**kwargs):
+        start = time.perf_counter()
+        try:
+            await func(**kwargs)
+        finally:
+            scheduler_job_duration.observe(time.perf_counter() - start, job_id)
+    return wrapper
+
+
 class TaskScheduler:
     def __init__(self):
         self.scheduler = AsyncIOScheduler()
+        self.lease: LeaderLease | None = None
+
+    def leader_only(self, job_id: str, func):
+        # Таймеры APScheduler идут в каждом воркере, но выполняет задачу только держатель аренды.
+        # Долгие задачи сверяются с арендой между пачками (keep_running) и останавливаются при её потере
+        lease = self.lease
+
+        def keep_running() -> bool:
+            return lease is None or lease.is_leader
+
+        @wraps(func)
+        async def wrapper():
+            if not keep_running():
+                logger.debug(f"Job {job_id} skipped: this worker is not the scheduler leader")
+                return
+            await func(keep_running=keep_running)
+        return wrapper
 
     def setup_tasks(self):
 
         if settings.AUTO_IMPORT_ENABLED:
             self.scheduler.add_job(
-                auto_import_task,
+                self.leader_only("auto_import", timed_job("auto_import", auto_import_task)),
                 IntervalTrigger(minutes=settings.AUTO_IMPORT_INTERVAL_MINUTES),
                 id="auto_import",
                 name="Автоматический импорт данных",
@@ -30,7 +63,7 @@ class TaskScheduler:
 
         if settings.CLEANUP_ENABLED:
             self.scheduler.add_job(
-                cleanup_expired_tasks,
+                self.leader_only("cleanup", timed_job("cleanup", cleanup_expired_tasks)),
                 IntervalTrigger(hours=settings.CLEANUP_INTERVAL_HOURS),
                 id="cleanup",
                 name="Автоматическая очистка устаревших задач",
@@ -38,26 +71,24 @@ class TaskScheduler:
             )
             logger.info("Cleanup task scheduled")
 
-        if settings.REMINDERS_ENABLED:
-            self.scheduler.add_job(
-                check_reminders,
-                IntervalTrigger(minutes=settings.REMINDER_CHECK_INTERVAL_MINUTES),
-                id="reminders",
-                name="Проверка напоминаний",
-                replace_existing=True
-            )
-            logger.info("Reminders task scheduled")
-
-    def start(self):
+    async def start(self):
         if settings.SCHEDULER_ENABLED:
+            if settings.SCHEDULER_LEADER_ELECTION:
+                self.lease = LeaderLease(
+                    await get_background_redis_client(), make_scheduler_lease_key(), settings.SCHEDULER_LEASE_TTL_SECONDS
+                )
+                self.lease.start()
             self.setup_tasks()
             self.scheduler.start()
             logger.info("Scheduler started")
 
-    def shutdown(self):
+    async def shutdown(self):
         if self.scheduler.running:
             self.scheduler.shutdown()
             logger.info("Scheduler stopped")
+        if self.lease is not None:
+            await self.lease.stop()
+            self.lease = None
 
 
 scheduler = TaskScheduler()
\ No newline at end of file
@@ -0,0 +1,115 @@
+import asyncio
+import dataclasses
+import gc
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.app.cache import service
+from src.app.cache.redis import RedisCache
+
+
+pytestmark = pytest.mark.anyio
+
+
+class Loader:
+    def __init__(self, value, delay=0.05):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value
+
+
+class DownRedis:
+    # Любая команда падает, как при недоступном Redis
+    def __getattr__(self, name):
+        async def fail(*args, **kwargs):
+            raise RedisConnectionError("Redis is down")
+        return fail
+
+    def pipeline(self, *args, **kwargs):
+        raise RedisConnectionError("Redis is down")
+
+
+async def test_concurrent_misses_run_one_load(redis):
+    cache = RedisCache(redis)
+    loader = Loader([{"id": "1"}])
+
+    results = await asyncio.gather(*(
+        service.get_or_set_cached_response("u1", "GET", "/tasks", {}, loader, 60, cache) for _ in range(20)
+    ))
+
+    assert loader.calls == 1
+    assert {status for _, status, _ in results} == {"MISS"}
+    assert all(value == [{"id": "1"}] for value, _, _ in results)
+    value, status, _ = await service.get_or_set_cached_response("u1", "GET", "/tasks", {}, loader, 60, cache)
+    assert (value, status, loader.calls) == ([{"id": "1"}], "HIT", 1)
+
+
+async def test_cancelled_waiter_does_not_cancel_shared_load(redis):
+    cache = RedisCache(redis)
+    loader = Loader([1], delay=0.1)
+
+    first = asyncio.ensure_future(service.get_or_set_cached_response("u1", "GET", "/tasks", {}, loader, 60, cache))
+    second = asyncio.ensure_future(service.get_or_set_cached_response("u1", "GET", "/tasks", {}, loader, 60, cache))
+    await asyncio.sleep(0.02)
+    first.cancel()
+
+    value, status, _ = await second
+    assert (value, status, loader.calls) == ([1], "MISS", 1)
+
+
+async def test_other_worker_holding_lock_is_awaited(redis):
+    cache = RedisCache(redis)
+    lock_key = service.make_cache_lock_key("u1", "GET", "/tasks", {})
+    await redis.set(lock_key, "other-worker", px=1000)
+    loader = Loader([2])
+
+    async def other_worker_stores():
+        await asyncio.sleep(0.05)
+        await service.set_cached_response("u1", "GET", "/tasks", {}, [1], 60, cache)
+
+    result, _ = await asyncio.gather(
+        service.get_or_set_cached_response("u1", "GET", "/tasks", {}, loader, 60, cache),
+        other_worker_stores(),
+    )
+
+    assert result[0] == [1]
+    assert loader.calls == 0
+
+
+async def test_lock_falls_back_to_local_load_when_redis_is_down():
+    cache = RedisCache(DownRedis())
+    loader = Loader([{"id": "1"}])
+
+    assert await cache.acquire_lock("lock", 1000) is not None
+    results = await asyncio.gather(*(
+        service.get_or_set_cached_response("u1", "GET", "/tasks", {}, loader, 60, cache) for _ in range(5)
+    ))
+
+    assert loader.calls == 1
+    assert all(result[:2] == ([{"id": "1"}], "MISS") for result in results)
+
+
+async def test_stale_value_is_served_while_failed_refresh_is_logged(redis, monkeypatch, caplog):
+    monkeypatch.setattr(service, "settings", dataclasses.replace(service.settings, CACHE_SWR_ENABLED=True))
+    cache = RedisCache(redis)
+    unhandled = []
+    asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+    await service.get_or_set_cached_response("u1", "GET", "/tasks", {}, Loader([1]), 60, cache)
+    await cache.invalidate_user_cache("u1")
+
+    async def failing_loader():
+        raise RuntimeError("Mongo is down")
+
+    value, status, _ = await service.get_or_set_cached_response("u1", "GET", "/tasks", {}, failing_loader, 60, cache)
+    await asyncio.sleep(0.01)
+    gc.collect()
+
+    assert (value, status) == ([1], "STALE")
+    assert "Cache refresh failed" in caplog.text
+    assert unhandled == []
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from src.app.cache.keys import make_import_job_key, make_import_processing_key
+from src.app.services import import_worker
+from src.app.services.import_jobs import ImportJobQueue
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def queue(redis, monkeypatch):
+    async def get_background_redis_client():
+        return redis
+    monkeypatch.setattr(import_worker, "get_background_redis_client", get_background_redis_client)
+    return ImportJobQueue(redis)
+
+
+async def enqueue(queue: ImportJobQueue) -> str:
+    return await queue.enqueue("nager", "64b000000000000000000001", {"country": "DE", "year": 2025}, "req-1")
+
+
+async def queued_ids(queue: ImportJobQueue) -> list[str]:
+    return [job_id.decode() for job_id in await queue.client.lrange(queue.queue_key, 0, -1)]
+
+
+async def test_in_flight_job_is_requeued_when_worker_is_cancelled(queue, monkeypatch):
+    started = asyncio.Event()
+
+    async def run_import_job(q, job_id):
+        await q.update(job_id, status="running")
+        started.set()
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(import_worker, "run_import_job", run_import_job)
+    first, second = await enqueue(queue), await enqueue(queue)
+
+    worker = asyncio.ensure_future(import_worker._worker(0, "owner-a"))
+    await asyncio.wait_for(started.wait(), 2)
+    assert await queued_ids(queue) == [second]
+
+    worker.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await worker
+
+    # Прерванное задание возвращается в начало очереди, а не теряется
+    assert await queued_ids(queue) == [first, second]
+    assert await queue.client.llen(make_import_processing_key("owner-a")) == 0
+    assert (await queue.get(first))["status"] == "queued"
+
+
+async def test_crashed_job_is_marked_failed_and_worker_continues(queue, monkeypatch):
+    done = []
+    next_job_started = asyncio.Event()
+
+    async def run_import_job(q, job_id):
+        done.append(job_id)
+        if len(done) == 1:
+            raise KeyError("broken job")
+        next_job_started.set()
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(import_worker, "run_import_job", run_import_job)
+    broken, healthy = await enqueue(queue), await enqueue(queue)
+
+    worker = asyncio.ensure_future(import_worker._worker(0, "owner-a"))
+    await asyncio.wait_for(next_job_started.wait(), 2)
+    worker.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await worker
+
+    assert done == [broken, healthy]
+    job = await queue.get(broken)
+    assert (job["status"], job["error_status"]) == ("failed", 500)
+    assert await queue.client.llen(make_import_processing_key("owner-a")) == 0
+
+
+async def test_jobs_of_a_dead_pool_are_recovered(queue):
+    alive, dead = "owner-alive", "owner-dead"
+    await queue.heartbeat(alive, 30)
+    kept, lost = await enqueue(queue), await enqueue(queue)
+    assert await queue.dequeue(alive, 1) == kept
+    assert await queue.dequeue(dead, 1) == lost
+
+    assert await queue.recover_orphaned() == 1
+    assert await queued_ids(queue) == [lost]
+    assert await queue.client.lrange(make_import_processing_key(alive), 0, -1) == [kept.encode()]
+    assert await queue.recover_orphaned() == 0
+
+
+async def test_update_does_not_recreate_an_expired_job(queue):
+    job_id = await enqueue(queue)
+    await queue.client.delete(make_import_job_key(job_id))
+
+    assert not await queue.update(job_id, status="running")
+    assert await queue.get(job_id) is None
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from datetime import date, datetime
+
+import pytest
+
+from src.app.db.repositories import InMemoryTasksRepository
+from src.app.services.leader import LeaderLease
+from src.app.services.retention import RetentionEngine
+from src.app.services.scheduler import TaskScheduler
+
+
+pytestmark = pytest.mark.anyio
+
+LEASE_KEY = "scheduler_lease:test"
+USER_ID = "64b000000000000000000001"
+
+
+async def wait_for(condition, timeout: float):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        await asyncio.sleep(0.005)
+
+
+async def test_only_one_worker_holds_the_lease(redis):
+    leases = [LeaderLease(redis, LEASE_KEY, 1.0) for _ in range(3)]
+    for lease in leases:
+        lease.start()
+    try:
+        await wait_for(lambda: any(lease.is_leader for lease in leases), 1.0)
+        await asyncio.sleep(0.2)
+        assert sum(lease.is_leader for lease in leases) == 1
+    finally:
+        for lease in leases:
+            await lease.stop()
+
+
+async def test_failover_happens_within_ttl(redis):
+    leader = LeaderLease(redis, LEASE_KEY, 1.0)
+    leader.start()
+    await wait_for(lambda: leader.is_leader, 1.0)
+    follower = LeaderLease(redis, LEASE_KEY, 1.0)
+    follower.start()
+    await asyncio.sleep(0.15)
+    assert not follower.is_leader
+
+    # Падение лидера без освобождения аренды
+    leader._task.cancel()
+    crashed_at = time.monotonic()
+    await wait_for(lambda: follower.is_leader, 1.5)
+    await follower.stop()
+
+    assert time.monotonic() - crashed_at <= 1.0
+
+
+async def test_lease_loss_stops_a_running_job(redis):
+    repo = InMemoryTasksRepository()
+    for day in range(1, 29):
+        await repo.create(USER_ID, {"title": f"old {day}", "date": date(2020, 1, day), "type": "task", "status": "todo"})
+    lease = LeaderLease(redis, LEASE_KEY, 0.3)
+    lease.start()
+    await wait_for(lambda: lease.is_leader, 1.0)
+
+    scheduler = TaskScheduler()
+    scheduler.lease = lease
+    reports = []
+
+    async def cleanup(keep_running):
+        engine = RetentionEngine(repo, batch_size=1, pause_seconds=0.05, keep_running=keep_running)
+        reports.append(await engine.run(datetime(2021, 1, 1)))
+
+    job = asyncio.ensure_future(scheduler.leader_only("cleanup", cleanup)())
+    await asyncio.sleep(0.1)
+    # Аренду перехватил другой воркер (например, после паузы GC дольше ttl)
+    await redis.set(LEASE_KEY, "other-worker", px=10_000)
+    await asyncio.wait_for(job, 1.0)
+    await lease.stop()
+
+    report = reports[0]
+    assert not report.complete
+    assert 0 < report.deleted < 28
+    assert len(await repo.list(USER_ID)) == 28 - report.deleted
+
+
+async def test_job_is_skipped_without_the_lease(redis):
+    await redis.set(LEASE_KEY, "other-worker", px=10_000)
+    lease = LeaderLease(redis, LEASE_KEY, 1.0)
+    lease.start()
+    await asyncio.sleep(0.05)
+    scheduler = TaskScheduler()
+    scheduler.lease = lease
+    calls = []
+
+    async def job(keep_running):
+        calls.append(keep_running())
+
+    await scheduler.leader_only("cleanup", job)()
+    await lease.stop()
+
+    assert calls == []
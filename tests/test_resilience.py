@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from src.app.core.config import settings
+from src.app.external.resilience import CLOSED, HALF_OPEN, OPEN, CircuitOpenError, UpstreamPolicy
+
+
+pytestmark = pytest.mark.anyio
+
+REQUEST = httpx.Request("GET", "https://upstream.test/api")
+
+
+def make_policy(**overrides) -> UpstreamPolicy:
+    policy = UpstreamPolicy("test")
+    policy.base_delay = 0.001
+    policy.max_delay = 0.001
+    policy.hedge_enabled = False
+    for name, value in overrides.items():
+        setattr(policy, name, value)
+    return policy
+
+
+class Upstream:
+    # Отдаёт заранее заданные ответы по очереди: код статуса, исключение или (задержка, код)
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def __call__(self) -> httpx.Response:
+        outcome = self.outcomes[min(self.calls, len(self.outcomes) - 1)]
+        self.calls += 1
+        if isinstance(outcome, Exception):
+            raise outcome
+        delay, status_code = outcome if isinstance(outcome, tuple) else (0, outcome)
+        await asyncio.sleep(delay)
+        return httpx.Response(status_code, request=REQUEST)
+
+
+async def test_retries_transient_errors_until_success():
+    policy = make_policy(attempts=3)
+    upstream = Upstream(503, httpx.ConnectError("reset"), 200)
+
+    response = await policy.get(upstream)
+
+    assert (response.status_code, upstream.calls) == (200, 3)
+    assert policy.breaker.state == CLOSED
+
+
+async def test_client_errors_are_not_retried():
+    policy = make_policy(attempts=3)
+    upstream = Upstream(404)
+
+    assert (await policy.get(upstream)).status_code == 404
+    assert upstream.calls == 1
+
+
+async def test_last_error_is_raised_when_attempts_are_exhausted():
+    policy = make_policy(attempts=2)
+    upstream = Upstream(httpx.ConnectError("refused"))
+
+    with pytest.raises(httpx.ConnectError):
+        await policy.get(upstream)
+    assert upstream.calls == 2
+
+
+async def test_deadline_cuts_the_attempt_in_flight():
+    policy = make_policy(attempts=3, deadline=0.2)
+    started = time.monotonic()
+
+    with pytest.raises(httpx.TimeoutException, match="retry budget"):
+        await policy.get(Upstream((5, 200)))
+    assert time.monotonic() - started < 0.5
+
+
+async def test_breaker_opens_then_lets_one_probe_through():
+    policy = make_policy(attempts=1)
+    policy.breaker.failure_threshold = 2
+    policy.breaker.open_seconds = 0.1
+
+    for _ in range(2):
+        await policy.get(Upstream(500))
+    assert policy.breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        await policy.get(Upstream(200))
+
+    await asyncio.sleep(0.1)
+    slow_probe = asyncio.ensure_future(policy.get(Upstream((0.05, 200))))
+    await asyncio.sleep(0.01)
+    assert policy.breaker.state == HALF_OPEN
+    # Пока идёт пробный запрос, остальные отклоняются
+    with pytest.raises(CircuitOpenError):
+        await policy.get(Upstream(200))
+    assert (await slow_probe).status_code == 200
+    assert policy.breaker.state == CLOSED
+
+
+async def test_slow_primary_is_hedged():
+    policy = make_policy(attempts=1, hedge_enabled=True)
+    policy.latencies.extend([0.01] * settings.UPSTREAM_HEDGE_MIN_SAMPLES)
+    upstream = Upstream((5, 200), 200)
+
+    started = time.monotonic()
+    response = await policy.get(upstream)
+
+    assert response.status_code == 200
+    assert upstream.calls == 2
+    assert time.monotonic() - started < 1
@@ -0,0 +1,67 @@
+import json
+from datetime import date
+
+import pytest
+
+from src.app.db.repositories import InMemoryTasksRepository
+
+
+pytestmark = pytest.mark.anyio
+
+ALICE = "64b000000000000000000001"
+BOB = "64b000000000000000000002"
+
+
+async def make_repo() -> InMemoryTasksRepository:
+    repo = InMemoryTasksRepository()
+    for day, title in ((3, "Exam in physics"), (1, "Buy groceries"), (2, "Physics lab report")):
+        await repo.create(ALICE, {"title": title, "date": date(2025, 1, day), "type": "task", "status": "todo"})
+    await repo.create(BOB, {"title": "Dentist", "date": date(2025, 2, 1), "type": "meeting", "status": "todo"})
+    return repo
+
+
+async def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "tasks.json")
+    repo = await make_repo()
+    first = (await repo.list(ALICE))[0]
+    await repo.update(first["id"], {"status": "done"})
+
+    assert await repo.save_snapshot(path) == 4
+    restored = InMemoryTasksRepository()
+    assert await restored.load_snapshot(path) == 4
+
+    for user_id in (ALICE, BOB):
+        assert await restored.list(user_id) == await repo.list(user_id)
+    assert (await restored.get(first["id"]))["status"] == "done"
+    # Поисковый и пользовательский индексы перестраиваются при загрузке
+    assert [t["title"] for t in await restored.search(ALICE, "physics")] == \
+        [t["title"] for t in await repo.search(ALICE, "physics")]
+    page = await restored.list(ALICE, limit=1, after=(first["date"], first["id"]))
+    assert [t["title"] for t in page] == ["Physics lab report"]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+async def test_missing_snapshot_loads_nothing(tmp_path):
+    assert await InMemoryTasksRepository().load_snapshot(str(tmp_path / "absent.json")) == 0
+
+
+async def test_unknown_snapshot_version_is_rejected(tmp_path):
+    path = tmp_path / "tasks.json"
+    path.write_text(json.dumps({"version": 999, "tasks": []}), encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        await InMemoryTasksRepository().load_snapshot(str(path))
+
+
+def test_snapshot_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "tasks.json")
+    owner, other = InMemoryTasksRepository(), InMemoryTasksRepository()
+    owner.lock_snapshot(path)
+    try:
+        with pytest.raises(RuntimeError, match="another process"):
+            other.lock_snapshot(path)
+    finally:
+        owner.unlock_snapshot()
+
+    other.lock_snapshot(path)
+    other.unlock_snapshot()